@@ -0,0 +1,78 @@
+import numpy as np
+from graphs import DelaunayGraph
+from arrayutils import circumcenters
+
+class AlphaFiltration(DelaunayGraph):
+    '''the alpha complexes of the vertices of a Delaunay Triangulation for all values of alpha at once, from
+    which the alpha shape (a concave outline of the points) at any alpha is read off without recomputing.
+
+    Every simplex gets the squared radius at which it enters the complex: 0 for the vertices, its squared
+    circumradius for a triangle, and for an edge half its squared length, unless it is attached, i.e. the
+    opposite vertex of an adjacent triangle lies inside its diametral circle, in which case it enters with
+    the smallest such triangle. A simplex never enters before its faces. The triangles and the edges are
+    sorted by these values once, so the complex at any alpha is a prefix of each order, found by binary
+    search.
+
+    Attributes (besides those of DelaunayGraph):
+        tri_r2, edge_r2         the squared radius at which each triangle and each edge enters
+        tri_order, edge_order   the triangles and the edges by increasing entering radius'''
+
+    def __init__(self, triangulation):
+        super().__init__(triangulation)
+
+        a, b, c = (self.xy[self.tris[:, i]] for i in range(3))
+        cx, cy = circumcenters(b[:, 0]-a[:, 0], b[:, 1]-a[:, 1], c[:, 0]-a[:, 0], c[:, 1]-a[:, 1])
+        self.tri_r2 = cx*cx + cy*cy
+
+        # an edge attached to a triangle (obtuse at the opposite vertex w) enters with the triangle
+        attached_r2 = np.full(len(self.edges), np.inf)
+        for i in range(3):
+            e, w = self.tri_edges[:, i], self.tris[:, i]
+            u, v = self.edges[e, 0], self.edges[e, 1]
+            dot = ((self.xy[u] - self.xy[w])*(self.xy[v] - self.xy[w])).sum(axis=1)
+            np.minimum.at(attached_r2, e[dot < 0], self.tri_r2[dot < 0])
+        self.edge_r2 = np.where(np.isfinite(attached_r2), attached_r2, self.d2 / 4)
+
+        self.tri_order = np.argsort(self.tri_r2, kind='stable')
+        self.edge_order = np.argsort(self.edge_r2, kind='stable')
+        self._tri_sorted = self.tri_r2[self.tri_order]
+        self._edge_sorted = self.edge_r2[self.edge_order]
+
+    def critical_values(self):
+        '''return the sorted distinct values of alpha at which the alpha shape changes'''
+        return np.sqrt(np.union1d(self._tri_sorted, self._edge_sorted))
+
+    def alpha_shape(self, alpha):
+        '''return (tris, edges, boundary) for the alpha complex of radius alpha: the indices into self.tris and
+        self.edges of its triangles and edges, and its boundary as a (k,2) array of vertex index pairs, each
+        directed so that the shape lies to its left (CCW around the outer outlines, CW around the holes).
+        The boundary consists of the edges of exactly one triangle of the complex; edges of no triangle (the
+        dangling parts of the shape) are among `edges` only.'''
+        a2 = alpha*alpha
+        tris = self.tri_order[:np.searchsorted(self._tri_sorted, a2, side='right')]
+        edges = self.edge_order[:np.searchsorted(self._edge_sorted, a2, side='right')]
+
+        count = np.bincount(self.tri_edges[tris].ravel(), minlength=len(self.edges))
+        t, i = np.nonzero(count[self.tri_edges[tris]] == 1)
+        t = tris[t]
+        boundary = np.stack([self.tris[t, (i+1) % 3], self.tris[t, (i+2) % 3]], axis=1)
+        return tris, edges, boundary
+
+def outlines(boundary):
+    '''stitch the directed boundary edges returned by AlphaFiltration.alpha_shape() into closed polygons,
+    returned as lists of vertex indices (without repeating the first vertex). Where the shape touches
+    itself at a vertex, the polygons meeting there are separated arbitrarily.'''
+    out = {}
+    for u, v in boundary.tolist():
+        out.setdefault(u, []).append(v)
+
+    polygons = []
+    for start in list(out):
+        while out.get(start):
+            polygon = [start]
+            v = out[start].pop()
+            while v != start:
+                polygon.append(v)
+                v = out[v].pop()
+            polygons.append(polygon)
+    return polygons
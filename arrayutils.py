@@ -0,0 +1,56 @@
+import numpy as np
+
+def morton_order(xs, ys, bits=16):
+    '''return the permutation sorting the points (xs[i], ys[i]) along a Z-order (Morton) curve, so that
+    consecutive points in that order are mostly close to each other'''
+    def spread(v):
+        v = v.astype(np.uint64)
+        v = (v | (v << np.uint64(8))) & np.uint64(0x00FF00FF)
+        v = (v | (v << np.uint64(4))) & np.uint64(0x0F0F0F0F)
+        v = (v | (v << np.uint64(2))) & np.uint64(0x33333333)
+        v = (v | (v << np.uint64(1))) & np.uint64(0x55555555)
+        return v
+
+    scale = (1 << bits) - 1
+    def quantize(v):
+        lo, hi = v.min(), v.max()
+        return np.rint((v - lo) / (hi - lo) * scale) if hi > lo else np.zeros_like(v)
+
+    return np.argsort(spread(quantize(xs)) | (spread(quantize(ys)) << np.uint64(1)), kind='stable')
+
+def expand(sizes):
+    '''the "repeat trick": return (owner, k) such that for each i, owner == i for sizes[i] consecutive
+    entries whose k runs over 0..sizes[i]-1'''
+    owner = np.repeat(np.arange(len(sizes)), sizes)
+    starts = np.cumsum(sizes) - sizes
+    k = np.arange(len(owner)) - starts[owner]
+    return owner, k
+
+def distinct(keys):
+    '''return the sorted distinct values of an integer array (by sorting, which is much faster here than the
+    hash table np.unique() uses for large integer arrays)'''
+    keys = np.sort(keys)
+    first = np.ones(len(keys), dtype=bool)
+    first[1:] = keys[1:] != keys[:-1]
+    return keys[first]
+
+def contains(sorted_keys, keys):
+    '''return a boolean array telling for each of keys whether it occurs in the sorted array sorted_keys'''
+    i = np.minimum(np.searchsorted(sorted_keys, keys), max(len(sorted_keys) - 1, 0))
+    return sorted_keys[i] == keys if len(sorted_keys) else np.zeros(len(keys), dtype=bool)
+
+def circumcenters(ax, ay, bx, by):
+    '''return the circumcenters of the triangles (0, a, b) formed by the origin and the points a, b'''
+    d = 2*(ax*by - ay*bx)
+    a2 = ax*ax + ay*ay
+    b2 = bx*bx + by*by
+    return (by*a2 - ay*b2)/d, (ax*b2 - bx*a2)/d
+
+def chunks(sizes, limit):
+    '''split range(len(sizes)) into consecutive slices whose sizes sum to about `limit` at most'''
+    cum = np.cumsum(sizes)
+    start, done = 0, 0
+    while start < len(sizes):
+        end = max(int(np.searchsorted(cum, done + limit, side='right')), start + 1)
+        yield slice(start, end)
+        done, start = cum[end-1], end
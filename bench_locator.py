@@ -0,0 +1,37 @@
+import time
+import random
+from delaunay import sample_integer_points, Triangulation
+from trapezoidal_map import TrapezoidalMap
+from primitives import Point
+
+# Parameters
+sizes = [250, 500, 1000, 2000]  # Number of points to triangulate
+num_queries = 2000
+
+# Measure query throughput of SegmentTree.vertical_shoot against a TrapezoidalMap built once
+for n in sizes:
+    random.seed(n)
+    points = sample_integer_points(n)
+
+    T = Triangulation(points, use_tree=True, make_legal=False)
+    T.random_incremental()
+
+    start_time = time.time()
+    M = TrapezoidalMap.from_triangulation(T)
+    build = time.time() - start_time
+
+    # query points strictly inside the sampled range, off the integer grid of the vertices
+    queries = [Point(2*random.randrange(1, 5*n-1)+1, 2*random.randrange(1, 5*n-1)+1, 2) for _ in range(num_queries)]
+
+    start_time = time.time()
+    for q in queries:
+        T.tree.vertical_shoot(q)
+    tree_time = time.time() - start_time
+
+    start_time = time.time()
+    for q in queries:
+        M.locate(q)
+    map_time = time.time() - start_time
+
+    print("n={:6d}  map build {:.3f}s  tree {:9.0f} q/s  map {:9.0f} q/s  speedup {:.1f}x".format(
+        n, build, num_queries/tree_time, num_queries/map_time, tree_time/map_time))
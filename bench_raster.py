@@ -0,0 +1,32 @@
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+from raster import rasterize, write_png
+
+# Times raster.rasterize() on a jittered grid mesh of about 10^6 triangles (or the number given as the first
+#   argument) at 2000x2000 pixels: filled with interpolated values, as a wireframe, and writing the PNG.
+
+m = int(sys.argv[1]) if len(sys.argv) > 1 else 10**6
+width = 2000
+
+k = int(np.ceil(np.sqrt(m/2))) + 1 # k x k vertices, 2(k-1)^2 triangles
+rng = np.random.default_rng(0)
+i, j = np.divmod(np.arange(k*k), k)
+xy = np.stack([j, i], axis=1) + rng.uniform(-0.3, 0.3, (k*k, 2))
+v = (i*k + j).reshape(k, k)[:-1, :-1].ravel()
+tris = np.concatenate([np.stack([v, v+1, v+k+1], axis=1), np.stack([v, v+k+1, v+k], axis=1)])
+values = np.sin(xy[:, 0]/50)*np.cos(xy[:, 1]/70)
+
+def timed(label, f):
+    start = time.perf_counter()
+    out = f()
+    print("{:<10} {:8.2f} s".format(label, time.perf_counter() - start))
+    return out
+
+print("{} triangles at {}x{}".format(len(tris), width, width))
+img = timed('filled', lambda: rasterize(xy, tris, width, width, values=values))
+timed('wireframe', lambda: rasterize(xy, tris, width, width))
+with tempfile.TemporaryDirectory() as tmp:
+    timed('write_png', lambda: write_png(os.path.join(tmp, 'mesh.png'), img))
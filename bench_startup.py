@@ -0,0 +1,37 @@
+import os
+import subprocess
+import statistics
+import sys
+
+# Measures the time to `import delaunay` in a fresh interpreter and fails (exit code 1) if a plotting
+#   library was pulled in, or if the median exceeds the budget given as the first argument (in ms).
+#   The interpreters run in the directory of this script, so it can be started from anywhere.
+
+PLOTTING = ('matplotlib', 'PIL')
+runs = 10
+here = os.path.dirname(os.path.abspath(__file__))
+budget_ms = float(sys.argv[1]) if len(sys.argv) > 1 else None
+
+probe = '''
+import sys, time
+start = time.perf_counter()
+import delaunay
+elapsed = time.perf_counter() - start
+loaded = sorted(m for m in sys.modules if m.split('.')[0] in {})
+print(elapsed, ','.join(loaded))
+'''.format(repr(set(PLOTTING)))
+
+timings = []
+for _ in range(runs):
+    out = subprocess.run([sys.executable, '-c', probe], cwd=here, capture_output=True, text=True, check=True).stdout.split()
+    timings.append(1000*float(out[0]))
+    if len(out) > 1:
+        print("FAIL: importing delaunay loaded", out[1])
+        sys.exit(1)
+
+median = statistics.median(timings)
+print("import delaunay: median {:.1f} ms, min {:.1f} ms, max {:.1f} ms over {} runs".format(median, min(timings), max(timings), runs))
+
+if budget_ms is not None and median > budget_ms:
+    print("FAIL: median import time exceeds budget of {:.1f} ms".format(budget_ms))
+    sys.exit(1)
@@ -0,0 +1,377 @@
+import argparse
+import gc
+import inspect
+import json
+import linecache
+import math
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+from delaunay import sample_integer_points, Triangulation
+from hierarchy import DelaunayHierarchy
+from trapezoidal_map import TrapezoidalMap
+from primitives import Point
+
+# Benchmarks every build mode, point locator and nearest-site query of Triangulation over several point distributions, and
+#   reports the median and percentile timings and the peak traced memory of each as JSON:
+#
+#   python bench_suite.py --sizes 1000,10000 --out results.json
+#   python bench_suite.py --sizes 1000,10000 --baseline results.json --tolerance 0.25
+#
+#   The second form exits with status 1 if any median time, peak memory or retained memory grew by more than
+#   the tolerance. Every build also reports the memory retained by the finished triangulation, broken down
+#   by memory_report() into edges, adjacency, locator and other allocations, per vertex and per edge.
+#   Modes whose running time grows quadratically are skipped above their `max_n` unless --no-limits is given.
+
+# ----- distributions -----
+
+def uniform(n):
+    '''sample_integer_points(): distinct integer x- and y-coordinates'''
+    return sample_integer_points(n)
+
+def clustered(n, k=10, spread=0.03, scale=1<<20):
+    '''n points around k Gaussian cluster centers, with integer coordinates and distinct x-coordinates'''
+    centers = [(random.random(), random.random()) for _ in range(k)]
+    xs = set()
+    pts = []
+    while len(pts) < n:
+        cx, cy = random.choice(centers)
+        x = int((cx + random.gauss(0, spread))*scale)
+        y = int((cy + random.gauss(0, spread))*scale)
+        if x not in xs:
+            xs.add(x)
+            pts.append(Point(x, y))
+    return pts
+
+def grid(n):
+    '''the first n points of a square grid, with the perturbation hack of delaunay_demo.py (i, j) ->
+    (i + j^2/s, j + i^2/s) for s above the largest j^2, so that no two points share an x-coordinate'''
+    side = math.isqrt(n-1) + 1
+    s = side*side
+    return [Point(s*i + j*j, s*j + i*i, s) for i in range(side) for j in range(side)][:n]
+
+def circle(n, radius=1<<20):
+    '''n exactly cocircular points with distinct x-coordinates, from the rational parametrization
+    ((1-t^2)/(1+t^2), 2t/(1+t^2)) of the circle with t = k/n for distinct |k|'''
+    pts = []
+    for k in random.sample(range(1, 4*n), n):
+        k = k if random.random() < 0.5 else -k
+        pts.append(Point(radius*(n*n - k*k), radius*2*n*k, n*n + k*k))
+    return pts
+
+def mt_bruno(n=None, fname=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mt_bruno_elevation.dat')):
+    '''the 24x25 Mt Bruno elevation grid of delaunay_demo.py (n is ignored)'''
+    pts = []
+    with open(fname) as f:
+        for i, line in enumerate(f):
+            for j, _ in enumerate(line.split(',')):
+                pts.append(Point(10000*i+j**2, 10000*j+i**2, 10000))
+    return pts
+
+DISTRIBUTIONS = {
+    'uniform': uniform,
+    'clustered': clustered,
+    'grid': grid,
+    'circle': circle,
+    'mt_bruno': mt_bruno,
+}
+
+# ----- build modes -----
+
+def build_naive_flip(P):
+    T = Triangulation(P, use_tree=False, make_legal=False)
+    T.random_incremental()
+    T.naive_delaunay()
+    return T
+
+def build_incremental(P):
+    T = Triangulation(P, use_tree=False, make_legal=True)
+    T.random_incremental()
+    return T
+
+def build_tree_flip(P):
+    T = Triangulation(P, use_tree=True, make_legal=False)
+    T.random_incremental()
+    T.naive_delaunay()
+    return T
+
+def build_tree(P):
+    T = Triangulation(P, use_tree=True, make_legal=True)
+    T.random_incremental()
+    return T
+
+def build_dynamic_hull(P):
+    T = Triangulation(P, use_tree=True, make_legal=True, dynamic_hull=True)
+    T.random_incremental()
+    return T
+
+def build_hierarchy(P):
+    return DelaunayHierarchy(P).triangulation()
+
+# name -> (build function, max_n)
+BUILDS = {
+    'naive_flip': (build_naive_flip, 2000),
+    'incremental': (build_incremental, 2000),
+    'tree_flip': (build_tree_flip, 20000),
+    'tree': (build_tree, None),
+    'dynamic_hull': (build_dynamic_hull, None),
+    'hierarchy': (build_hierarchy, None),
+}
+
+# ----- locators -----
+# each setup(T, P) returns a function answering one batch of query points
+
+def setup_naive(T, P):
+    return lambda qs: [T.naive_ray_shoot(q) for q in qs]
+
+def setup_segment_tree(T, P):
+    return lambda qs: [T.tree.vertical_shoot(q) for q in qs]
+
+def setup_vertical_shoot_many(T, P):
+    return T.vertical_shoot_many
+
+def setup_trapezoidal_map(T, P):
+    M = TrapezoidalMap.from_triangulation(T)
+    return M.locate_many
+
+def setup_walk(T, P):
+    start = next(iter(T.hull_pts))
+    return lambda qs: [T.walk_locate(q, start) for q in qs]
+
+def setup_hierarchy(T, P):
+    H = DelaunayHierarchy(P)
+    return lambda qs: [H.locate(q) for q in qs]
+
+# name -> (setup function, max_n)
+LOCATORS = {
+    'naive_ray_shoot': (setup_naive, 5000),
+    'segment_tree': (setup_segment_tree, None),
+    'vertical_shoot_many': (setup_vertical_shoot_many, None),
+    'trapezoidal_map': (setup_trapezoidal_map, None),
+    'walk': (setup_walk, 20000),
+    'hierarchy': (setup_hierarchy, None),
+}
+
+# ----- nearest-site queries -----
+# each setup(T, P) returns a function answering one batch of query points with the closest vertices
+
+def setup_brute_force(T, P):
+    verts = list(T.adj)
+    def nearest(q):
+        x, y = q.x(), q.y()
+        return min(verts, key=lambda v: (v.x() - x)**2 + (v.y() - y)**2)
+    return lambda qs: [nearest(q) for q in qs]
+
+def setup_nearest_vertex(T, P):
+    return lambda qs: [T.nearest_vertex(q) for q in qs]
+
+def setup_nearest_many(T, P):
+    return T.nearest_many
+
+# name -> (setup function, max_n)
+NEAREST = {
+    'brute_force': (setup_brute_force, 20000),
+    'nearest_vertex': (setup_nearest_vertex, None),
+    'nearest_many': (setup_nearest_many, None),
+}
+
+def query_points(T, k):
+    '''return k centroids of random bounded triangles of T, which lie strictly inside them'''
+    verts, tris, _ = T.to_arrays()
+    qs = []
+    for t in random.choices(range(len(tris)), k=k):
+        a, b, c = (verts[i] for i in tris[t])
+        w = a._w*b._w*c._w
+        x = a._x*b._w*c._w + b._x*a._w*c._w + c._x*a._w*b._w
+        y = a._y*b._w*c._w + b._y*a._w*c._w + c._y*a._w*b._w
+        qs.append(Point(x, y, 3*w))
+    return qs
+
+# ----- measurement -----
+
+def summarize(times):
+    '''return the median and the 10th/90th percentiles of the given times in seconds'''
+    times = sorted(times)
+    def pct(q):
+        return times[min(len(times)-1, int(q*len(times)))]
+    return {'median': statistics.median(times), 'p10': pct(0.1), 'p90': pct(0.9), 'min': times[0], 'repeat': len(times)}
+
+def measure(fn, repeat, seed, traced=True):
+    '''time fn() `repeat` times with the random seed reset before each run, then (if traced) once more under
+    tracemalloc to record the peak memory allocated; return the summary and the result of the last untraced run'''
+    times = []
+    for _ in range(repeat):
+        random.seed(seed)
+        start = time.perf_counter()
+        res = fn()
+        times.append(time.perf_counter() - start)
+
+    summary = summarize(times)
+    if traced:
+        random.seed(seed)
+        tracemalloc.start()
+        fn()
+        _, summary['peak_bytes'] = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return summary, res
+
+# (file, function) of the code whose allocations are attributed to each part of a Triangulation
+EDGE_CODE = [inspect.getsourcelines(f) for f in (Triangulation.add_segment, Triangulation.remove_segment)]
+EDGE_CODE = [(inspect.getsourcefile(Triangulation), start, start + len(lines)) for lines, start in EDGE_CODE]
+LOCATOR_FILES = ('segment_tree.py', 'trapezoidal_map.py', 'dynamic_hull.py')
+
+def classify(traceback):
+    '''return the part of a Triangulation an allocation with the given tracemalloc traceback belongs to:
+    'locator' if made by a segment tree (or other locator module), 'adjacency' or 'edges' if made by
+    add_segment()/remove_segment() on a line updating self.adj or the edge list, and 'other' otherwise'''
+    for frame in traceback:
+        if frame.filename.endswith(LOCATOR_FILES):
+            return 'locator'
+    for frame in traceback:
+        for fname, first, last in EDGE_CODE:
+            if frame.filename == fname and first <= frame.lineno < last:
+                return 'adjacency' if 'adj' in linecache.getline(fname, frame.lineno) else 'edges'
+    return 'other'
+
+def memory_report(fn, nframes=3):
+    '''run fn() under tracemalloc, keeping `nframes` frames per allocation (enough to see the caller of a
+    constructor like Segment(), while deeper tracebacks make tracing much slower), and return the Triangulation it
+    builds with a dict of the peak traced memory and the memory retained by the result, in total, per vertex,
+    per edge and by the parts of classify() (the locator also per vertex), grouped by source file too'''
+    gc.collect()
+    tracemalloc.start(nframes)
+    before = tracemalloc.take_snapshot()
+    T = fn()
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    parts = dict.fromkeys(('edges', 'adjacency', 'locator', 'other'), 0)
+    files = {}
+    for stat in after.compare_to(before, 'traceback'):
+        parts[classify(stat.traceback)] += stat.size_diff
+        fname = os.path.basename(stat.traceback[-1].filename)
+        files[fname] = files.get(fname, 0) + stat.size_diff
+
+    n, e = len(T.adj), len(T.edges)
+    total = sum(parts.values())
+    return T, {
+        'peak_bytes': peak,
+        'total_bytes': total,
+        'bytes_per_vertex': total/n,
+        'bytes_per_edge': (parts['edges'] + parts['adjacency'])/e,
+        'locator_bytes_per_vertex': parts['locator']/n,
+        'parts': parts,
+        'files': dict(sorted(files.items(), key=lambda kv: -kv[1])),
+    }
+
+def allowed(max_n, n, no_limits):
+    return no_limits or max_n is None or n <= max_n
+
+def run(distributions, sizes, builds, locators, nearest=(), repeat=3, queries=1000, seed=290, no_limits=False, memory=True, log=sys.stderr):
+    '''run the benchmarks, returning a list of result records'''
+    results = []
+    for dist in distributions:
+        for n in (sizes if dist != 'mt_bruno' else [None]):
+            random.seed(seed)
+            P = DISTRIBUTIONS[dist](n)
+            n = len(P)
+
+            for mode in builds:
+                fn, max_n = BUILDS[mode]
+                if not allowed(max_n, n, no_limits):
+                    continue
+                summary, _ = measure(lambda: fn(P), repeat, seed, traced=not memory)
+                if memory:
+                    random.seed(seed)
+                    summary.update(memory_report(lambda: fn(P))[1])
+                results.append(dict(kind='build', dist=dist, n=n, name=mode, **summary))
+                print("build   {:10s} n={:8d} {:14s} median {:9.4f}s".format(dist, n, mode, summary['median']), file=log, end='')
+                if memory:
+                    print(" {:8.0f} B/vertex {:6.0f} B/edge {:8.0f} B/vertex in locator".format(
+                        summary['bytes_per_vertex'], summary['bytes_per_edge'], summary['locator_bytes_per_vertex']), file=log, end='')
+                print(file=log)
+
+            todo = [(kind, name) for kind, table, names in (('locate', LOCATORS, locators), ('nearest', NEAREST, nearest))
+                    for name in names if allowed(table[name][1], n, no_limits)]
+            if not todo:
+                continue
+            random.seed(seed)
+            T = build_tree(P)
+            qs = query_points(T, queries)
+            for kind, name in todo:
+                setup, _ = (LOCATORS if kind == 'locate' else NEAREST)[name]
+                random.seed(seed)
+                start = time.perf_counter()
+                locate = setup(T, P)
+                setup_time = time.perf_counter() - start
+
+                summary, _ = measure(lambda: locate(qs), repeat, seed)
+                summary['setup'] = setup_time
+                summary['queries_per_second'] = len(qs)/summary['median']
+                results.append(dict(kind=kind, dist=dist, n=n, name=name, **summary))
+                print("{:7s} {:10s} n={:8d} {:20s} {:12.0f} q/s".format(kind, dist, n, name, summary['queries_per_second']), file=log)
+
+    return results
+
+def key(r):
+    return (r['kind'], r['dist'], r['n'], r['name'])
+
+def compare(results, baseline, tolerance):
+    '''return a list of messages, one for each result whose median time, peak memory or retained memory exceeds
+    the matching baseline result by more than the fraction `tolerance`'''
+    old = {key(r): r for r in baseline}
+    regressions = []
+    for r in results:
+        b = old.get(key(r))
+        if b is None:
+            continue
+        for metric in ('median', 'peak_bytes', 'total_bytes'):
+            if metric in b and r[metric] > b[metric]*(1 + tolerance):
+                regressions.append("{} {} n={} {}: {} {:.4g} -> {:.4g} (+{:.0%})".format(
+                    r['kind'], r['dist'], r['n'], r['name'], metric, b[metric], r[metric], r[metric]/b[metric] - 1))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='benchmark the build modes, point locators and nearest-site queries of Triangulation')
+    parser.add_argument('--sizes', default='250,1000', help='comma-separated numbers of points, up to 10^6')
+    parser.add_argument('--dists', default=','.join(DISTRIBUTIONS))
+    parser.add_argument('--builds', default=','.join(BUILDS))
+    parser.add_argument('--locators', default=','.join(LOCATORS))
+    parser.add_argument('--nearest', default=','.join(NEAREST), help='nearest-site methods, compared against a brute-force scan')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=290)
+    parser.add_argument('--no-limits', action='store_true', help='also run quadratic modes on large inputs')
+    parser.add_argument('--no-memory', action='store_true', help='skip the memory breakdown of each build')
+    parser.add_argument('--out', help='write the JSON results to this file instead of stdout')
+    parser.add_argument('--baseline', help='JSON results of an earlier run to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed relative slowdown or memory growth')
+    args = parser.parse_args(argv)
+
+    split = lambda s: [x for x in s.split(',') if x]
+    results = run(split(args.dists), [int(n) for n in split(args.sizes)], split(args.builds), split(args.locators),
+                  split(args.nearest), args.repeat, args.queries, args.seed, args.no_limits, not args.no_memory)
+
+    report = {'python': sys.version.split()[0], 'seed': args.seed, 'results': results}
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=1)
+    else:
+        print(json.dumps(report, indent=1))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f)['results'], args.tolerance)
+        for msg in regressions:
+            print("REGRESSION", msg, file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,73 @@
+import numpy as np
+from arrayutils import expand
+
+def contours(tin, levels):
+    '''return the isolines of the scalar values of the TIN tin at the given levels: a list with, for each
+    level in the given order, a list of polylines as (k,2) arrays of points, where a closed polyline ends
+    with its first point. Vertices with a value equal to a level count as above it. The higher values lie
+    to the left of every polyline, so closed ones run CCW around peaks and CW around pits.
+
+    All levels are handled in one pass: the levels crossing each triangle (those above its lowest and at
+    most its highest value) are found by binary search and expanded to (triangle, level) pairs with the
+    repeat trick, and every pair gives one piece, entering the triangle across the edge whose start (in CCW
+    order) is above the level and leaving it across the edge whose end is. The edge a piece leaves by is
+    the edge the next piece enters by, in the neighbor triangle from tin.nbrs, at the same level; the
+    points are interpolated from the lower vertex index of each edge, so both pieces share them exactly.
+    The pieces are then stitched into polylines by following these links, in time linear in the output.'''
+    z = tin.values
+    if z.ndim != 1:
+        raise ValueError("contours() expects one value per vertex, got values of shape {}".format(z.shape))
+    levels = np.asarray(levels, dtype=np.float64).ravel()
+    nl = len(levels)
+    order = np.argsort(levels, kind='stable')
+    sorted_levels = levels[order]
+
+    zt = z[tin.tris]
+    lo = np.searchsorted(sorted_levels, zt.min(axis=1), side='right')
+    hi = np.searchsorted(sorted_levels, zt.max(axis=1), side='right')
+    t, k = expand(hi - lo)
+    li = lo[t] + k
+    lev = sorted_levels[li]
+
+    # edge i of a triangle runs from its vertex i+1 to its vertex i+2 (mod 3), opposite vertex i
+    above = zt[t] >= lev[:, None]
+    start, end = above[:, [1, 2, 0]], above[:, [2, 0, 1]]
+    entry = np.argmax(start & ~end, axis=1)
+    leave = np.argmax(~start & end, axis=1)
+
+    def crossing(i):
+        u, v = tin.tris[t, (i+1) % 3], tin.tris[t, (i+2) % 3]
+        u, v = np.minimum(u, v), np.maximum(u, v)
+        s = ((lev - z[u]) / (z[v] - z[u]))[:, None]
+        return tin.xy[u] + s*(tin.xy[v] - tin.xy[u])
+
+    first, last = crossing(entry), crossing(leave)
+
+    # the pieces are sorted by (triangle, level), so the piece following each one is found by binary search
+    key = t*nl + li
+    nb = tin.nbrs[t, leave]
+    nxt = np.where(nb >= 0, np.searchsorted(key, np.maximum(nb, 0)*nl + li), -1)
+    has_prev = np.zeros(len(key), dtype=bool)
+    has_prev[nxt[nxt >= 0]] = True
+
+    # follow the links from every piece without a predecessor (open polylines, ending on the hull), then
+    # around the remaining cycles (closed polylines)
+    nxt_list = nxt.tolist()
+    seen = np.zeros(len(key), dtype=bool)
+    chains = []
+    for p in np.concatenate([np.nonzero(~has_prev)[0], np.arange(len(key))]).tolist():
+        if seen[p]:
+            continue
+        chain = []
+        q = p
+        while q >= 0 and not seen[q]:
+            seen[q] = True
+            chain.append(q)
+            q = nxt_list[q]
+        chains.append((chain, q >= 0))
+
+    out = [[] for _ in range(nl)]
+    for chain, closed in chains:
+        tail = first[chain[:1]] if closed else last[chain[-1:]]
+        out[order[li[chain[0]]]].append(np.concatenate([first[chain], tail]))
+    return out
@@ -1,28 +1,49 @@
 from primitives import *
 import random
-import matplotlib.pyplot as plt
 from itertools import islice
-from graham import graham
+from graham import convex_hull
+from dynamic_hull import DynamicHull
 import numpy as np
+import heapq
+from collections import deque
+from arrayutils import morton_order
 
 from segment_tree import *
-from segment_tree import SegmentTree
+from segment_tree import FlatSegmentTree
+
+# methods whose calls are reported to observers, as (method name, event, whether its result is reported too)
+_EMITTERS = (
+    ('_locate', 'point_located', True),
+    ('flip', 'edge_flipped', False),
+    ('add_segment', 'segment_added', False),
+    ('remove_segment', 'segment_removed', False),
+)
 
 class Triangulation():
 
-    def __init__(self, pts, use_tree=False, make_legal=False, DRAW=False, SAVE_TO_GIF=False):
+    def __init__(self, pts, use_tree=False, make_legal=False, DRAW=False, SAVE_TO_GIF=False, dynamic_hull=False, observers=(), stats=None):
         '''Create a new Triangulation given a list of 2D Points by first inserting all points
         on its convex hull (whose edges must be in the triangulation), then inserts the rest in some sorted order.
         
         Optional parameters:
-        - If `use_tree` is True, then a SegmentTree will be used to identify the segment above a given point to insert.
+        - If `use_tree` is True, then a (flat, array-backed) segment tree will be used to identify the segment above a given point to insert.
         
         - If `make_legal` is True, then the legalize() method is called as new segments of the triangulation are created.
+
+        - If `dynamic_hull` is True, then the points are also kept in a DynamicHull (self.dynamic_hull), and
+            insert_point() also accepts points outside the convex hull, updating hull_pts and hull_edges.
         
         - If `SAVE_TO_GIF` is True, then the .save_plot() method will save the figure currently in `plt` as one frame of the GIF to be exported.
             Call self.show_plot() to either display the plot (if SAVE_TO_GIF is False) or save the current plot as one frame of the GIF to be exported.
 
-        - If `DRAW` is True, self.DRAW can be used in the bodies of the methods to optionally draw for debugging/animation purposes.
+        - If `DRAW` is True, a rendering.PlotObserver is subscribed, which draws a frame (see show_plot()) whenever
+            a point is located, an edge is flipped or a hull edge is added.
+
+        - `observers` are subscribed (see subscribe()) before any segment is added, e.g. an events.EventRecorder
+            to log the whole construction.
+
+        - If `stats` is a stats.Stats object, it counts the predicates, flips, point locations and segment tree updates of
+            this triangulation and times its phases (see stats.Stats.attach()).
         
         Attributes:
             pts
@@ -32,56 +53,112 @@ class Triangulation():
             adj
             tree
             make_legal
+            observers
+            stats
         '''
         self.DRAW = DRAW
         self.SAVE_TO_GIF = SAVE_TO_GIF
+        self.FRAMES = None
         self.TITLE = None
 
         self.pts = list(pts)
         self.verts = []
-        
-        # compute convex hull of pts
-        hull = graham(pts)
-        h = len(hull)
-        self.hull_pts = set(hull)
-        self.hull_edges = set(Segment(hull[i],hull[(i+1)%h]) for i in range(h))
 
-        # initialize empty edges list and adjacency map
-        self.edges = []
+        # initialize empty edge set (a dict from each Segment to None, keeping insertion order) and adjacency map
+        self.edges = {}
         self.adj = {}
+        self._arrays = None # cached result of to_arrays(), reset whenever an edge changes
 
         if use_tree:
-            self.tree = SegmentTree.from_2d_points(pts)
+            self.tree = FlatSegmentTree.from_2d_points(pts)
         else:
             self.tree = None
 
         self.make_legal = make_legal
 
+        self.stats = stats
+        if stats is not None:
+            stats.attach(self)
+
+        self.observers = []
+        if DRAW:
+            import rendering
+            self.subscribe(rendering.PlotObserver(self))
+        for observer in observers:
+            self.subscribe(observer)
+
+        # compute convex hull of pts
+        self.dynamic_hull = DynamicHull() if dynamic_hull else None
+        hull = self.compute_hull()
+        h = len(hull)
+        self.hull_pts = set(hull)
+        self.hull_edges = set(Segment(hull[i],hull[(i+1)%h]) for i in range(h))
+
         # initialize this triangulation as a triangle with first 3 points on the hull
         p1,p2,p3 = hull[:3]
         self.add_segment(p1, p2)
         self.add_segment(p2, p3)
         self.add_segment(p3, p1)
 
-        if self.DRAW:
-            self.draw()
-            self.show_plot()
-
         # for the remaining points on the hull, add them one-by-one by connecting to
         #   the first and previous points on the hull
         for i in range(3,h):
             self.add_segment(hull[i], hull[0]) # new outer edge
             self.add_segment(hull[i], hull[i-1]) # new inner edge
 
-            if self.DRAW:
-                self.draw()
-                Segment(hull[i], hull[0]).draw(color='black')
-                Segment(hull[i], hull[i-1]).draw(color='black')
-                self.show_plot()
-            
             if self.make_legal: 
                 self.legalize(hull[i], hull[i-1], hull[0]) # legalize inner edge
     
+    def compute_hull(self):
+        '''return the convex hull of self.pts in CCW order, starting from its leftmost point; if self.dynamic_hull
+        is set, the points are inserted into it and the hull is read from it'''
+        if self.dynamic_hull is not None:
+            for p in self.pts:
+                self.dynamic_hull.insert(p)
+            return self.dynamic_hull.hull()
+        return convex_hull(self.pts)
+
+    def subscribe(self, observer):
+        '''register a callable observer(event, *args), called after each of the following events:
+            point_located(p, above, above_point)  the segment above p (or containing it) was found by insert_point()
+            edge_flipped(a, b, c, d)              the edge ab was replaced by cd
+            segment_added(a, b)
+            segment_removed(a, b)
+        A flip also reports the removal of ab and the addition of cd before edge_flipped.
+
+        While nobody is subscribed, the methods above are plain methods of the class; the first
+        subscription shadows them on this instance with wrappers that notify self.observers.'''
+        if not self.observers:
+            self._unobserved = {name: self.__dict__.get(name) for name, _, _ in _EMITTERS}
+            for name, event, returns in _EMITTERS:
+                setattr(self, name, self._emitting(name, event, returns))
+        self.observers.append(observer)
+
+    def unsubscribe(self, observer):
+        '''remove an observer registered with subscribe(), restoring the methods as they were before the
+        first subscription after the last one is removed'''
+        self.observers.remove(observer)
+        if not self.observers:
+            for name, method in self._unobserved.items():
+                if method is None:
+                    del self.__dict__[name]
+                else:
+                    setattr(self, name, method)
+
+    def _emitting(self, name, event, returns):
+        '''return the method `name` of this instance wrapped to report `event` to self.observers'''
+        method = getattr(self, name)
+        observers = self.observers
+
+        def emitting(*args):
+            res = method(*args)
+            data = args[:1] + tuple(res) if returns else args
+            for observer in observers:
+                observer(event, *data)
+            return res
+
+        return emitting
+
     def random_incremental(self):
         '''add the rest of the points in self.pts to the tree (assumes the hull points were
         added during the constructor, __init__()).'''
@@ -124,48 +201,95 @@ class Triangulation():
 
         return (above_seg, above_point)
 
+    def vertical_shoot_many(self, points):
+        '''given a list of points, answer naive_ray_shoot() for all of them at once. Returns a pair of
+        arrays (idx, hits): idx[i] is the position in list(self.edges) of the segment containing points[i]
+        or lowest visible upwards from it (-1 if none), and hits[i] is the visible point as (x, y) floats.
+
+        The queries are sorted by x and answered in one sweep: with self.tree, a single batched stabbing
+        query; otherwise a sweep over the edges sorted by their left endpoint. Candidates are compared
+        exactly via primitives.y_at(), and no Line or intersection Point is created.'''
+
+        edges = list(self.edges)
+        n = len(points)
+        idx = np.full(n, -1, dtype=np.int64)
+        hits = np.full((n, 2), np.nan)
+
+        if self.tree:
+            pos = {s: i for i, s in enumerate(edges)}
+            stabbed = self.tree.stabbing_query_many(points)
+            candidates = lambda i: ((pos[s], s) for s in stabbed[i])
+            order_q = range(n)
+        else:
+            order_e = sorted(range(len(edges)), key=lambda i: edges[i].left.x_proj())
+            order_q = sorted(range(n), key=lambda i: points[i].x_proj())
+            active = {}
+            expiry = [] # heap of (right endpoint, edge index) for the edges in active
+            nxt = 0
+            candidates = lambda i: active.items()
+
+        for i in order_q:
+            p = points[i]
+
+            if not self.tree:
+                x = p.x_proj()
+                while nxt < len(order_e) and edges[order_e[nxt]].left.x_proj() <= x:
+                    e = order_e[nxt]
+                    active[e] = edges[e]
+                    heapq.heappush(expiry, (edges[e].right.x_proj(), e))
+                    nxt += 1
+                while expiry and expiry[0][0] < x:
+                    del active[heapq.heappop(expiry)[1]]
+
+            best, best_num, best_den = -1, None, None
+            for e, s in candidates(i):
+                if s.is_vertical():
+                    if s.contains_point(p):
+                        best, best_num, best_den = e, p._y, p._w
+                        break
+                    continue
+
+                num, den = y_at(s, p)
+                c = num*p._w - p._y*den
+                if c == 0: # s contains p
+                    best, best_num, best_den = e, p._y, p._w
+                    break
+                if c > 0 and (best < 0 or num*best_den < best_num*den):
+                    best, best_num, best_den = e, num, den
+
+            if best >= 0:
+                idx[i] = best
+                hits[i] = (p.x(), best_num/best_den)
+
+        return idx, hits
+
     def naive_delaunay(self):
         '''While there are illegal edges in the triangulation, flip them.
         When it terminates, this triangulation is Delaunay.
 
         ASSUMPTION: all points of self.pts have been inserted into the triangulation'''
 
-        stack = set()  # Use a set to avoid duplicates
-        for s in self.edges:
-            stack.add((s.p1, s.p2))
-
-        while len(stack) > 0:
-            a, b = stack.pop()
-            res = self.is_illegal(a, b)
+        # a FIFO work queue of edges, each queued at most once at a time (Segments compare regardless of direction)
+        queue = deque(self.edges)
+        queued = set(queue)
 
-            if res is (None, None):
+        while queue:
+            seg = queue.popleft()
+            queued.discard(seg)
+            a, b = seg.p1, seg.p2
+            c, d = self.is_illegal(a, b)
+            if c is None: # ab is legal
                 continue
-            else:
-                c, d = res
-                if Segment(a, b) in self.edges:
-                    self.remove_segment(a, b)
-                if Segment(b, a) in self.edges:
-                    self.remove_segment(b, a)
-                if Segment(c, d) not in self.edges and Segment(d, c) not in self.edges:
-                    self.add_segment(c, d) # do not need to add to stack, must be legal
-
-                '''add the given segment to this triangulation, updating its adjacency map and segment tree
-                seg = Segment(a,b)
-                self.edges.append(seg)'''
-
-                edges_to_check = [
-                    (a, c), (c, b), (d, b), (d, a)
-                ]
-                for edge in edges_to_check:
-                    if Segment(edge[0], edge[1]) in self.edges or Segment(edge[1], edge[0]) in self.edges:
-                        stack.add(edge)
-            
-            # TODO: Finish this implementation (Task 1):
-            #  - Call .is_illegal() to check the popped edge ab
-            #  - If necessary, flip this edge by calling self.remove_segment() and self.add_segment() appropriately
-            #  - Finally, add appropriate segments onto the "stack"
 
+            self.flip(a, b, c, d) # do not need to add cd to the queue, must be legal
 
+            # the sides of the quadrilateral acbd may have become illegal
+            for x, y in ((a, c), (c, b), (d, b), (d, a)):
+                if self.has_edge(x, y):
+                    side = Segment(x, y)
+                    if side not in queued:
+                        queued.add(side)
+                        queue.append(side)
 
     def legalize(self, p, a, b):
         '''Given a newly-inserted point p and edge (a, b), this method checks if edge (a, b) is illegal.
@@ -188,11 +312,6 @@ class Triangulation():
         idx_q = idx_temp
         q = temp
 
-        if ccw(a, p, b):
-            ccw_points = [p, b, q, a]
-        else:
-            ccw_points = [p, a, q, b]
-
         if q == p:
             idx_temp = (idx_b - 1) % len(incident_a) # need to mod
             temp = incident_a[idx_temp]
@@ -202,13 +321,17 @@ class Triangulation():
             idx_q = idx_temp
             q = temp
 
+        if ccw(a, p, b):
+            ccw_points = [p, b, q, a]
+        else:
+            ccw_points = [p, a, q, b]
+
         if not self.verify_convex(ccw_points):
             return
 
-        circum = Circle(p, a, b)
+        circum = Circle(a, b, p) if ccw(a, b, p) else Circle(b, a, p) # in_circle() expects CCW order
         if circum.in_circle(q):
-            self.remove_segment(a, b)
-            self.add_segment(p, q)
+            self.flip(a, b, p, q)
 
             self.legalize(p, q, a)
             self.legalize(p, q, b)
@@ -227,7 +350,7 @@ class Triangulation():
         '''return (None, None) if segment ab is legal, otherwise return the two points c,d on the 
         convex quadrilateral with a,b for which segment ab is illegal and cd is legal.'''
         
-        if not Segment(a,b) in self.edges or Segment(a,b) in self.hull_edges:
+        if not self.has_edge(a, b) or Segment(a,b) in self.hull_edges:
             return (None, None)
 
         c = self.get_ccw_neighbor(a,b)
@@ -236,44 +359,11 @@ class Triangulation():
         if not self.verify_convex([c,a,d,b]):
             return (None, None)
         
-        if self.DRAW:
-            Triangle(a,b,c).draw(color='lightgray')
-            Triangle(a,b,d).draw(color='lightgray')
-            self.draw()
-            Segment(a,b).draw(color='red')
-            a.draw(color='darkorange')
-            b.draw(color='darkorange')
-            c.draw(color='darkorange')
-            self.show_plot()
-
         circ = Circle(a,b,c)
 
-        if self.DRAW:
-            Triangle(a,b,c).draw(color='lightgray')
-            Triangle(a,b,d).draw(color='lightgray')
-            self.draw()
-            circ.draw()
-            Segment(a,b).draw(color='red')
-            a.draw(color='darkorange')
-            b.draw(color='darkorange')
-            c.draw(color='darkorange')
-            self.show_plot()
-            
         if not circ.in_circle(d):
             return (None, None)
         
-        if self.DRAW:
-            Triangle(a,b,c).draw(color='lightgray')
-            Triangle(a,b,d).draw(color='lightgray')
-            self.draw()
-            circ.draw()
-            Segment(a,b).draw(color='red')
-            Segment(c,d).draw(color='green')
-            a.draw(color='darkorange')
-            b.draw(color='darkorange')
-            c.draw(color='darkorange')
-            self.show_plot()
-            
         return (c,d)
 
     def verify_convex(self, pts):
@@ -285,7 +375,8 @@ class Triangulation():
 
         seg = Segment(a,b)
 
-        self.edges.append(seg)
+        self.edges[seg] = None
+        self._arrays = None
         
         if seg.p1 not in self.adj:
             self.adj[seg.p1] = set()
@@ -304,7 +395,8 @@ class Triangulation():
         
         seg = Segment(a,b)
 
-        self.edges.remove(seg)
+        del self.edges[seg]
+        self._arrays = None
 
         self.adj[seg.p1].remove(seg.p2)
         self.adj[seg.p2].remove(seg.p1)
@@ -312,6 +404,10 @@ class Triangulation():
         if self.tree and not seg.is_vertical():
             self.tree.delete(seg)
 
+    def has_edge(self, a, b):
+        '''return True if and only if the segment ab is an edge of this triangulation'''
+        return a in self.adj and b in self.adj[a]
+
     def get_incident(self, p):
         '''given a point p of the triangulation, return a sorted list of its of adjacent points
         in clockwise order'''
@@ -336,27 +432,277 @@ class Triangulation():
         idx = adj.index(b)
         return adj[(idx-1)%len(adj)]
     
-    def insert_point(self, p):
+    def _hull_step(self, v, forward=True):
+        '''return the hull vertex following (or, if not forward, preceding) the hull vertex v in CCW order'''
+        for u in self.adj[v]:
+            if Segment(v, u) in self.hull_edges:
+                a, b = (v, u) if forward else (u, v)
+                if not any(cw(a, b, w) for w in self.adj[v]): # the triangulation lies left of a -> b
+                    return u
+
+    def visible_chain(self, p):
+        '''return the hull vertices, in CCW order, of the chain of hull edges with the point p strictly to their
+        right (outside the hull), or an empty list if p lies in the closed hull. A first such edge is found by
+        self.dynamic_hull in O(log n) time, then the chain is followed along hull_edges in both directions.'''
+        edge = self.dynamic_hull.visible_edge(p)
+        if edge is None:
+            return []
+
+        chain = deque(edge)
+        while True:
+            v = self._hull_step(chain[-1])
+            if not cw(chain[-1], v, p):
+                break
+            chain.append(v)
+        while True:
+            v = self._hull_step(chain[0], forward=False)
+            if not cw(v, chain[0], p):
+                break
+            chain.appendleft(v)
+        return list(chain)
+
+    def _update_hull(self, p, chain):
+        '''add the point p to self.dynamic_hull and, if p sees the hull edges of `chain` (see visible_chain()),
+        replace them in hull_pts and hull_edges by the two edges from p to the ends of the chain'''
+        self.dynamic_hull.insert(p)
+        if not chain:
+            return
+        for a, b in zip(chain, chain[1:]):
+            self.hull_edges.discard(Segment(a, b))
+        self.hull_pts.difference_update(chain[1:-1])
+        self.hull_pts.add(p)
+        self.hull_edges.update((Segment(chain[-1], p), Segment(p, chain[0])))
+
+    def is_triangle(self, a, b, c):
+        '''return True if and only if the CCW triangle (a, b, c) is a face of this triangulation'''
+        return self.has_edge(a, b) and self.has_edge(b, c) and self.has_edge(c, a) and self.get_ccw_neighbor(a, b) == c
+
+    def incident_triangles(self, p):
+        '''return the triangles incident to the vertex p as CCW tuples (p, u, w)'''
+        incident = self.get_incident(p) # CW order
+        k = len(incident)
+        return [(p, incident[(j+1)%k], incident[j]) for j in range(k)
+                if ccw(p, incident[(j+1)%k], incident[j]) and self.has_edge(incident[j], incident[(j+1)%k])]
+
+    def split_hull_edge(self, a, b, p):
+        '''insert the point p lying in the interior of the hull edge ab, connecting it to a, b and the vertex
+        opposite ab, then legalize the two other edges of the new triangles (the counterpart of insert_point()
+        for the points it excludes). hull_pts and hull_edges are updated; p adds no corner to the hull.'''
+        c = self.get_ccw_neighbor(a, b)
+        if not (ccw(a, b, c) and self.has_edge(b, c)):
+            c = self.get_cw_neighbor(a, b)
+
+        self.remove_segment(a, b)
+        self.hull_edges.discard(Segment(a, b))
+        self.hull_edges.update((Segment(a, p), Segment(p, b)))
+        self.hull_pts.add(p)
+
+        self.add_segment(p, a)
+        self.add_segment(p, b)
+        self.add_segment(p, c)
+
+        if self.make_legal:
+            self.legalize(p, a, c)
+            self.legalize(p, c, b)
+
+    def walk_locate(self, p, start, rng=random):
+        '''given a point p inside the convex hull and a vertex `start` of this triangulation, return a
+        triangle (a, b, c) in CCW order containing p, found by walking from `start` across the edges
+        that separate the current triangle from p (a "remembering stochastic walk", Devillers et al. 2002):
+        the edges of each triangle are tested starting from one chosen at random with `rng`, which
+        guarantees termination, and the edge the walk entered by is not tested again, as p lies on its
+        inner side.'''
+
+        # find the triangle around `start` whose cone contains the direction towards p
+        incident = self.get_incident(start) # CW order
+        k = len(incident)
+        tri = None
+        for j in range(k):
+            u, w = incident[j], incident[(j+1)%k]
+            if ccw(start, w, u) and u in self.adj[w]:
+                if tri is None:
+                    tri = (start, w, u)
+                if not cw(start, w, p) and not ccw(start, u, p):
+                    tri = (start, w, u)
+                    break
+
+        a, b, c = tri
+        edges = [(a,b), (b,c), (c,a)]
+        while True:
+            i = rng.randrange(len(edges))
+            for x, y in edges[i:] + edges[:i]:
+                if cw(x, y, p): # p is strictly right of x -> y, so cross into the triangle there
+                    if Segment(x,y) in self.hull_edges:
+                        raise ValueError("point lies outside the convex hull: {}".format(p))
+                    a, b, c = y, x, self.get_cw_neighbor(x, y)
+                    edges = [(b,c), (c,a)] # remember the edge ab just crossed
+                    break
+            else:
+                return (a, b, c)
+
+    def locate_triangle(self, p, start=0):
+        '''return the index into the arrays of to_arrays() of a triangle whose closure contains the point p, or -1
+        if p lies outside the convex hull, found by an exact stochastic walk (see walk_locate()) from the
+        triangle `start`'''
+        verts, tris, nbrs = self.to_arrays()
+        if len(tris) == 0:
+            return -1
+        t = start
+        while t >= 0:
+            tri, nb = tris[t].tolist(), nbrs[t].tolist()
+            i = random.randrange(3)
+            for i in (i, (i+1)%3, (i+2)%3):
+                if cw(verts[tri[(i+1)%3]], verts[tri[(i+2)%3]], p): # p is strictly outside the edge opposite vertex i
+                    t = nb[i]
+                    break
+            else:
+                return t
+        return -1
+
+    def walk_segment(self, a, b, start=0):
+        '''return the triangles crossed by the segment from the point a to the point b, and where it crosses their
+        edges, as arrays (tris, edges, params, points):
+            tris    the indices into to_arrays() of the triangles visited, starting with one containing a
+            edges   the crossed edges as pairs of vertex indices, tris[k] and tris[k+1] sharing edges[k]
+            params  the parameters s in [0,1) of the crossings a + s(b - a), nondecreasing
+            points  the crossings as (x, y) floats
+        The walk ends in a triangle containing b, or after the crossing where the segment leaves the hull, so
+        that edges has one entry less than tris or as many. Where the segment passes through a vertex, the
+        triangles around that vertex between its two sides are visited too, with equal parameters.
+
+        From each triangle, the segment leaves across the edge u -> v (CCW) with b strictly beyond it and u
+        on the right of the segment and v on its left or on it, tested with the exact orient(), and never
+        across the edge it entered by. The parameters are computed exactly from orient() before rounding.
+        ASSUMPTION: a lies in the convex hull.'''
+        verts, tris, nbrs = self.to_arrays()
+        t = self.locate_triangle(a, start)
+        if t < 0:
+            raise ValueError("point lies outside the convex hull: {}".format(a))
+
+        visited, edges, params = [t], [], []
+        came = -1
+        while True:
+            tri, nb = tris[t].tolist(), nbrs[t].tolist()
+            for i in range(3):
+                if came >= 0 and nb[i] == came:
+                    continue
+                u, v = tri[(i+1)%3], tri[(i+2)%3]
+                U, V = verts[u], verts[v]
+                ob = orient(U, V, b)
+                if ob < 0 and orient(a, b, U) <= 0 <= orient(a, b, V):
+                    oa = orient(U, V, a)
+                    edges.append((u, v))
+                    params.append(oa / (oa - ob))
+                    break
+            else:
+                break # b lies in this triangle
+            if nb[i] < 0:
+                break # the segment leaves the hull
+            came, t = t, nb[i]
+            visited.append(t)
+
+        params = np.array(params, dtype=np.float64)
+        a_xy = np.array([a.x(), a.y()])
+        points = a_xy + params[:, None]*(np.array([b.x(), b.y()]) - a_xy)
+        return np.array(visited, dtype=np.int64), np.array(edges, dtype=np.int64).reshape(-1, 2), params, points
+
+    def walk_segments(self, segments):
+        '''walk_segment() for a list of pairs of points (a, b), returning the list of its results (tris, edges,
+        params, points) for each segment, or None for a segment whose start a lies outside the convex hull. The
+        segments are walked in Z-order of their starting points and every walk is located from the start of
+        the walk before.'''
+        if not segments:
+            return []
+
+        xs = np.array([a.x() for a, _ in segments], dtype=np.float64)
+        ys = np.array([a.y() for a, _ in segments], dtype=np.float64)
+        results = [None]*len(segments)
+        start = 0
+        for k in morton_order(xs, ys):
+            a, b = segments[k]
+            t = self.locate_triangle(a, start)
+            if t < 0:
+                continue # a lies outside the hull: no walk, and the next one starts from the same triangle
+            results[k] = self.walk_segment(a, b, t)
+            start = t
+        return results
+
+    def nearest_vertex(self, p, start=None):
+        '''return the vertex of this triangulation closest to the point p (any point of the plane), found by
+        walking greedily along self.adj from `start` to the closest neighbor of the current vertex until
+        none is closer than it. Without a start, the walk starts at an endpoint of the segment above p (see
+        _locate()), or at any vertex if there is none.
+
+        This finds the nearest vertex because the triangulation is Delaunay: if v is not the nearest vertex,
+        the segment from v to p leaves the Voronoi cell of v into that of a neighbor of v, which is closer.
+
+        ASSUMPTION: the triangulation is Delaunay (make_legal=True, or after naive_delaunay())'''
+        if start is None:
+            above, _ = type(self)._locate(self, p) # the class method: not a located point for observers or stats
+            start = above.left if above is not None else next(iter(self.adj))
+
+        v = start
+        while True:
+            best = v
+            for u in self.adj[v]:
+                if closer(u, best, p):
+                    best = u
+            if best is v:
+                return v
+            v = best
+
+    def nearest_many(self, points):
+        '''return the list of the vertices closest to each of the given points, as in nearest_vertex(). The
+        points are visited along a Z-order (Morton) curve and every walk starts at the answer for the point
+        before, so that only the first point is located and most walks take a step or two.'''
+        res = [None]*len(points)
+        if not points:
+            return res
+        xs = np.array([p.x() for p in points], dtype=np.float64)
+        ys = np.array([p.y() for p in points], dtype=np.float64)
+
+        v = None
+        for i in morton_order(xs, ys):
+            v = res[i] = self.nearest_vertex(points[i], v)
+        return res
+
+    def insert_point(self, p, tri=None):
         '''given a point p, insert it to the triangulation then modify it into a valid
         triangulation. If use_tree=True use self.tree to find p's visible segment, otherwise
         use the naive method. If legalize=True, legalize all relevant segments recursively.
 
-        ASSUMPTION: the given point p is contained in the interior of a triangle (face) of this triangulation
-        OR it lies on the interior of a segment (edge) not on the convex hull'''
-
-        if self.tree:
-            above, above_point = self.tree.vertical_shoot(p)
-        else:
-            above, above_point = self.naive_ray_shoot(p)
-
-        if self.DRAW:
-            self.draw()
-            above.draw(color='darkorange')
-            above_point.draw(color='orange')
-            if p != above_point:
-                Segment(p,above_point).draw(color='black', arrow=True)
-            p.draw(color='red')
-            self.show_plot()
+        If the triangle (a tuple of three Points) containing p is already known, e.g. from walk_locate(),
+        it can be passed as `tri` and p's visible segment is found among its edges instead.
+
+        If p lies in the interior of a hull edge, the edge is split by split_hull_edge(). With dynamic_hull=True,
+        p may also lie outside the convex hull: it is then connected to every vertex of visible_chain(p), whose
+        edges are legalized as they are no longer on the hull. This raises a ValueError with use_tree=True if
+        the x-coordinate of p is not among those of the tree, before the triangulation is changed.
+
+        ASSUMPTION: the given point p is contained in a triangle (face) of this triangulation, unless
+        dynamic_hull=True. A point found to have no segment above it raises a ValueError.'''
+
+        if self.dynamic_hull is not None and not self.dynamic_hull.contains(p):
+            chain = self.visible_chain(p)
+            if chain and self.tree and p.x_proj() not in self.tree.index:
+                raise ValueError("the segment tree cannot store edges ending at x = {}".format(p.x()))
+            self._update_hull(p, chain)
+
+            if chain:
+                for v in chain:
+                    self.add_segment(p, v)
+                if self.make_legal:
+                    for a, b in zip(chain, chain[1:]):
+                        self.legalize(p, a, b)
+                return
+
+        above, above_point = self._locate(p, tri)
+        if above is None:
+            raise ValueError("point lies outside the convex hull: {}".format(p))
+
+        if above in self.hull_edges and above.contains_interior_point(p):
+            self.split_hull_edge(above.p1, above.p2, p)
+            return
 
         a = above.left
         b = above.right
@@ -368,15 +714,6 @@ class Triangulation():
 
             self.remove_segment(a,b)
 
-            if self.DRAW:
-                self.draw()
-                Segment(p,a).draw(color='darkorange')
-                Segment(p,b).draw(color='darkorange')
-                Segment(p,c).draw(color='darkorange')
-                Segment(p,d).draw(color='darkorange')
-                p.draw(color='red')
-                self.show_plot()
-
             self.add_segment(p, a)
             self.add_segment(p, b)
             self.add_segment(p, c)
@@ -401,22 +738,112 @@ class Triangulation():
             self.legalize(p, a, d)
             self.legalize(p, d, b)
 
-        if self.DRAW:
-            self.draw()
-            Segment(p,a).draw(color='firebrick')
-            Segment(p,b).draw(color='firebrick')
-            Segment(p,d).draw(color='firebrick')
-            p.draw(color='red')
-            self.show_plot()
+    def _locate(self, p, tri=None):
+        '''return the segment above p (or containing it) and the visible point on it, as in naive_ray_shoot(),
+        looking only at the edges of the triangle `tri` if given, otherwise using self.tree if any'''
+        if tri is not None:
+            a, b, c = tri
+            return lowest_above([Segment(a,b), Segment(b,c), Segment(c,a)], p, p.vertical_line_thru())
+        elif self.tree:
+            return self.tree.vertical_shoot(p)
+        else:
+            return self.naive_ray_shoot(p)
+
+    def flip(self, a, b, c, d):
+        '''replace the edge ab by the edge cd, the other diagonal of the quadrilateral acbd'''
+        self.remove_segment(a, b)
+        self.add_segment(c, d)
     
     def draw(self):
-        for s in self.edges:
-            s.draw(color='gray')
-        
-        for p in self.pts:
-        # for p in self.adj.keys():
-            p.draw()
+        import rendering
+        rendering.draw_triangulation(self)
     
+    def to_arrays(self):
+        '''return an index-based description (verts, tris, nbrs) of the bounded triangles of this
+        Triangulation, where verts is the list of its Points, tris is an (m,3) integer array of vertex
+        indices of each triangle in CCW order, and nbrs[t,i] is the triangle sharing the edge of
+        triangle t opposite to vertex tris[t,i] (or -1 if that edge is on the convex hull).
+
+        The result is cached until the next call to add_segment() or remove_segment().'''
+
+        if self._arrays is not None:
+            return self._arrays
+
+        verts = list(self.adj.keys())
+        index = {p: i for i, p in enumerate(verts)}
+
+        # consecutive neighbors u, w (in CW order) around v bound a triangle (v, w, u) unless the
+        #   angle between them is reflex, which happens only across the outer face
+        tris = []
+        for i, v in enumerate(verts):
+            incident = self.get_incident(v)
+            k = len(incident)
+            for j in range(k):
+                u, w = incident[j], incident[(j+1)%k]
+                iu, iw = index[u], index[w]
+                if iu < i or iw < i: # report each triangle only from its smallest vertex index
+                    continue
+                if ccw(v, w, u) and u in self.adj[w]:
+                    tris.append((i, iw, iu))
+
+        nbrs = [[-1, -1, -1] for _ in tris]
+        edge_of = {}
+        for t, tri in enumerate(tris):
+            for i in range(3):
+                a, b = tri[(i+1)%3], tri[(i+2)%3]
+                key = (a, b) if a < b else (b, a)
+                if key in edge_of:
+                    s, j = edge_of.pop(key)
+                    nbrs[t][i] = s
+                    nbrs[s][j] = t
+                else:
+                    edge_of[key] = (t, i)
+
+        self._arrays = (verts, np.array(tris, dtype=np.int64).reshape(-1, 3), np.array(nbrs, dtype=np.int64).reshape(-1, 3))
+        return self._arrays
+
+    def check_delaunay(self, vectorized=False):
+        '''return the list of interior edges (as Segments) that are not locally Delaunay, i.e. whose
+        opposite vertex in one adjacent triangle lies strictly inside the circumcircle of the other, using
+        the exact primitives.incircle() in one pass over to_arrays(). An empty list certifies that this
+        triangulation is Delaunay, without scipy and for arbitrary (homogeneous) coordinates.
+
+        If `vectorized` is True, the test is first evaluated in floating point for all edges at once with
+        numpy, and only the edges whose determinant is too close to 0 to trust its sign are decided exactly.'''
+
+        verts, tris, nbrs = self.to_arrays()
+
+        # each interior edge once, as the edge opposite vertex i of triangle t, shared with triangle s > t
+        t, i = np.divmod(np.arange(nbrs.size), 3)
+        s = nbrs.ravel()
+        keep = s > t
+        t, i, s = t[keep], i[keep], s[keep]
+        j = np.argmax(nbrs[s] == t[:, None], axis=1) # the vertex of s opposite the shared edge
+        d = tris[s, j]
+
+        if vectorized:
+            xy = np.array([(p.x(), p.y()) for p in verts], dtype=np.float64).reshape(-1, 2)
+            (adx, ady), (bdx, bdy), (cdx, cdy) = (xy[tris[t, k]].T - xy[d].T for k in range(3))
+            (amx, amy), (bmx, bmy), (cmx, cmy) = (np.abs(xy[tris[t, k]].T) + np.abs(xy[d].T) for k in range(3))
+
+            det = ((adx*adx + ady*ady)*(bdx*cdy - cdx*bdy) + (bdx*bdx + bdy*bdy)*(cdx*ady - adx*cdy)
+                   + (cdx*cdx + cdy*cdy)*(adx*bdy - bdx*ady))
+            # a bound on the error of det, including the rounding of the coordinates to floats
+            permanent = ((amx*amx + amy*amy)*(bmx*cmy + cmx*bmy) + (bmx*bmx + bmy*bmy)*(cmx*amy + amx*cmy)
+                         + (cmx*cmx + cmy*cmy)*(amx*bmy + bmx*amy))
+            certain = np.abs(det) > 1e-14*permanent
+
+            bad = list(np.nonzero(certain & (det > 0))[0])
+            for e in np.nonzero(~certain)[0]:
+                a, b, c = (verts[v] for v in tris[t[e]])
+                if incircle(a, b, c, verts[d[e]]) > 0:
+                    bad.append(e)
+            bad.sort()
+        else:
+            bad = [e for e in range(len(t)) if incircle(*(verts[v] for v in tris[t[e]]), verts[d[e]]) > 0]
+
+        return [Segment(verts[tris[t[e], (i[e]+1)%3]], verts[tris[t[e], (i[e]+2)%3]]) for e in bad]
+
     def get_triangles(self):
         '''return the bounded triangles of this Triangulation'''
         tris = {}
@@ -467,45 +894,24 @@ class Triangulation():
         return set(self.edges) == scipy_edges
     
     def show_plot(self,margin=1.05):
-        '''outputs the current figure in plt to as a .png in the list self.FRAMES, otherwise displays as normal'''
-        try:
-            self.min_x
-        except:
-            self.FRAMES = []
-            self.min_x = min(p.x() for p in self.hull_pts)
-            self.max_x = max(p.x() for p in self.hull_pts)
-            self.min_y = min(p.y() for p in self.hull_pts)
-            self.max_y = max(p.y() for p in self.hull_pts)
-            self.dx = (margin-1)*(self.max_x - self.min_x)
-            self.dy = (margin-1)*(self.max_y - self.min_y)
-
-        plt.axis([self.min_x-self.dx, self.max_x+self.dx, self.min_y-self.dy, self.max_y+self.dy])
-        plt.gca().set_aspect('equal')
-        if self.SAVE_TO_GIF:
-            from PIL import Image # pip install pillow
-            import io
-
-            buf = io.BytesIO()
-            plt.savefig(buf, format='png')
-            plt.close()
-            buf.seek(0)
-            self.FRAMES.append(Image.open(buf))
-        else:
-            plt.show()
+        '''outputs the current figure in plt as one frame of the animation (see stream_to()) if SAVE_TO_GIF=True, otherwise displays as normal'''
+        import rendering
+        rendering.show_plot(self, margin)
+
+    def stream_to(self, fname, pause=1.0):
+        '''write each frame of self.show_plot() straight to the animation file fname (a .gif, or e.g. an .mp4
+        if ffmpeg is installed) as it is drawn, with pause seconds per frame; call save_plot() to finish it.
+        Frames drawn before, e.g. by the constructor with DRAW=True, are written first.'''
+        import rendering
+        rendering.stream_to(self, fname, pause)
 
     def save_plot(self, fname, pause=1.0):
-        '''saves the plots stored in self.FRAMES, populated by self.show_plot() with
-        when SAVE_TO_GIF=True in the constructor. fname is the local file name, and pause
-        is an optional parameter that is the number of seconds per frame (default 1.0).'''
-        if self.SAVE_TO_GIF:
-            self.FRAMES[0].save(
-                fname,
-                format='GIF',
-                append_images=self.FRAMES[1:],
-                save_all=True,
-                duration=int(pause*1000),  # Time in milliseconds between frames
-                loop=0         # 0 for infinite loop
-            )
+        '''finishes the animation of the frames from self.show_plot() when SAVE_TO_GIF=True in the constructor.
+        Without stream_to(), the frames were spooled to a temporary file and are now written as a GIF,
+        where fname is the local file name, and pause is an optional parameter that is the number of
+        seconds per frame (default 1.0).'''
+        import rendering
+        rendering.save_plot(self, fname, pause)
 
 def sample_integer_points(n,xoffset=0,yoffset=0,sparsity=5):
     '''returns a set of points with distinct integer coordinates,
@@ -517,6 +923,8 @@ def sample_integer_points(n,xoffset=0,yoffset=0,sparsity=5):
     return [Point(x+xoffset*sparsity,y+yoffset*sparsity) for x,y in islice(zip(xs,ys), n)]
 
 if __name__=='__main__':
+    import matplotlib.pyplot as plt
+
     random.seed(290)
     
     P = sample_integer_points(12)
@@ -0,0 +1,291 @@
+from primitives import *
+
+class _HullNode(object):
+    '''a node of the leaf-oriented AVL tree of a DynamicHull. A leaf stores one Point; an internal node
+    stores the upper and lower bridges (p, q) joining the hulls of the points in its left and right subtrees.'''
+
+    __slots__ = ('left', 'right', 'height', 'point', 'minp', 'upper', 'lower')
+
+    def __init__(self, point=None, left=None, right=None):
+        self.point = point
+        self.left = left
+        self.right = right
+        self.height = 0
+        self.minp = point
+        self.upper = None
+        self.lower = None
+
+class DynamicHull():
+    '''a fully dynamic convex hull supporting insertion and deletion of Points in O(log^2 n) time and
+    extreme-point and tangent queries in O(log n) time.
+
+    The points are kept sorted in the leaves of a balanced (AVL) tree, and every internal node stores
+    only the upper and lower bridges between the hulls of its two subtrees (Overmars and van Leeuwen),
+    so the hull of a subtree is implicitly the part of its left child's hull up to the bridge followed
+    by the part of its right child's hull after it. A bridge is found in O(log n) time by walking down
+    both children at once; an update recomputes the O(log n) bridges on its path to the root.
+
+    Like graham(), collinear points on the boundary are kept as hull vertices.
+
+    ASSUMPTION: no two points have the same x-coordinate.'''
+
+    def __init__(self, pts=()):
+        self.root = None
+        self.size = 0
+        for p in pts:
+            self.insert(p)
+
+    def __len__(self):
+        return self.size
+
+    # ----- updates -----
+
+    def insert(self, p):
+        '''insert the Point p, unless it is already present'''
+        self.root = self._insert(self.root, p)
+
+    def delete(self, p):
+        '''delete the Point p, raising a KeyError if it is not present'''
+        self.root = self._delete(self.root, p)
+        self.size -= 1
+
+    def _insert(self, v, p):
+        if v is None:
+            self.size += 1
+            return _HullNode(p)
+
+        if v.point is not None:
+            if v.point == p:
+                return v
+            self.size += 1
+            leaf = _HullNode(p)
+            return self._pull(_HullNode(None, v, leaf) if v.point < p else _HullNode(None, leaf, v))
+
+        if p < v.right.minp:
+            v.left = self._insert(v.left, p)
+        else:
+            v.right = self._insert(v.right, p)
+        return self._rebalance(v)
+
+    def _delete(self, v, p):
+        if v is None:
+            raise KeyError(p)
+
+        if v.point is not None:
+            if v.point == p:
+                return None
+            raise KeyError(p)
+
+        if p < v.right.minp:
+            child = self._delete(v.left, p)
+            if child is None:
+                return v.right
+            v.left = child
+        else:
+            child = self._delete(v.right, p)
+            if child is None:
+                return v.left
+            v.right = child
+        return self._rebalance(v)
+
+    def _pull(self, v):
+        '''recompute the height, minimum and bridges of the internal node v from its children'''
+        v.height = 1 + max(v.left.height, v.right.height)
+        v.minp = v.left.minp
+        v.upper = self._bridge(v, 1)
+        v.lower = self._bridge(v, -1)
+        return v
+
+    def _rotate_right(self, v):
+        u = v.left
+        v.left = u.right
+        u.right = self._pull(v)
+        return self._pull(u)
+
+    def _rotate_left(self, v):
+        u = v.right
+        v.right = u.left
+        u.left = self._pull(v)
+        return self._pull(u)
+
+    def _rebalance(self, v):
+        balance = v.left.height - v.right.height
+        if balance > 1:
+            if v.left.left.height < v.left.right.height:
+                v.left = self._rotate_left(v.left)
+            return self._rotate_right(v)
+        if balance < -1:
+            if v.right.right.height < v.right.left.height:
+                v.right = self._rotate_right(v.right)
+            return self._rotate_left(v)
+        return self._pull(v)
+
+    def _bridge(self, v, sign):
+        '''return the upper (sign=1) or lower (sign=-1) bridge (p, q) between the hulls of v's children.
+
+        The walk keeps nodes l, r whose subtrees contain p and q respectively, so that the bridge is also
+        the bridge between the hulls of l and r. The bridge (a, b) of l is an edge of hull(l), which stays
+        on the joint hull (so p lies right of it) if and only if no point of hull(r) is above its supporting
+        line; symmetrically for the bridge (c, d) of r.'''
+
+        l, r = v.left, v.right
+        sep = r.minp
+        while l.point is None or r.point is None:
+            if l.point is not None:
+                c, d = (r.upper if sign > 0 else r.lower)
+                r = r.left if sign*orient(c, d, l.point) <= 0 else r.right
+                continue
+
+            a, b = (l.upper if sign > 0 else l.lower)
+            if r.point is not None:
+                l = l.right if sign*orient(a, b, r.point) <= 0 else l.left
+                continue
+
+            c, d = (r.upper if sign > 0 else r.lower)
+            ab_off = sign*orient(a, b, c) > 0 or sign*orient(a, b, d) > 0 # some point of hull(r) above line ab
+            cd_off = sign*orient(c, d, a) > 0 or sign*orient(c, d, b) > 0 # some point of hull(l) above line cd
+            if ab_off or cd_off:
+                if ab_off:
+                    l = l.left
+                if cd_off:
+                    r = r.right
+                continue
+
+            # both lines lie above the other pair of points, so they cross at some x = m with ab the
+            #   steeper one: the hull of r lies below cd, which is below ab right of m, and vice versa
+            m = Line(a, b).intersect(Line(c, d))
+            if m is None or not m.is_right_of(sep):
+                l = l.right
+            else:
+                r = r.left
+
+        return (l.point, r.point)
+
+    # ----- queries -----
+
+    def _collect(self, v, lo, hi, sign, out):
+        '''append the vertices of the upper (sign=1) or lower (sign=-1) hull of v between the Points lo
+        and hi (None if unbounded), from left to right'''
+        if v.point is not None:
+            if (lo is None or not v.point < lo) and (hi is None or not hi < v.point):
+                out.append(v.point)
+            return
+
+        p, q = (v.upper if sign > 0 else v.lower)
+        if lo is None or not p < lo:
+            self._collect(v.left, lo, p if hi is None or p < hi else hi, sign, out)
+        if hi is None or not hi < q:
+            self._collect(v.right, q if lo is None or lo < q else lo, hi, sign, out)
+
+    def upper_hull(self):
+        '''return the vertices of the upper hull from left to right'''
+        out = []
+        if self.root is not None:
+            self._collect(self.root, None, None, 1, out)
+        return out
+
+    def lower_hull(self):
+        '''return the vertices of the lower hull from left to right'''
+        out = []
+        if self.root is not None:
+            self._collect(self.root, None, None, -1, out)
+        return out
+
+    def hull(self):
+        '''return the hull vertices in the order of graham(): CCW, starting from the leftmost point'''
+        upper = self.upper_hull()
+        return self.lower_hull() + upper[-2:0:-1]
+
+    def edges(self):
+        '''return the set of hull edges as Segments'''
+        h = self.hull()
+        return set(Segment(h[i], h[(i+1)%len(h)]) for i in range(len(h))) if len(h) > 1 else set()
+
+    def _search(self, sign, go_right):
+        '''binary search over the edges of the upper (sign=1) or lower (sign=-1) hull: starting at the root,
+        descend to the right of each hull edge (p, q) for which go_right(p, q) holds and to its left otherwise,
+        and return the vertex reached. Bridges of nodes that are not edges of the overall hull are skipped by
+        keeping the range [lo, hi] of overall hull vertices within the current subtree.'''
+        v = self.root
+        lo = hi = None
+        while v.point is None:
+            p, q = (v.upper if sign > 0 else v.lower)
+            if hi is not None and hi < q:
+                v = v.left
+            elif lo is not None and p < lo:
+                v = v.right
+            elif go_right(p, q):
+                lo, v = q, v.right
+            else:
+                hi, v = p, v.left
+        return v.point
+
+    def extreme(self, dx, dy):
+        '''return a hull vertex maximizing dx*x + dy*y'''
+        sign = 1 if dy >= 0 else -1
+        return self._search(sign, lambda p, q: dx*(q.x()-p.x()) + dy*(q.y()-p.y()) > 0)
+
+    def tangents(self, z, upper=True):
+        '''given a Point z within the x-range of the hull and above its upper hull (or below its lower hull
+        if upper=False), return the pair (left, right) of hull vertices touched by the tangents through z'''
+        sign = 1 if upper else -1
+        visible = lambda p, q: sign*orient(p, q, z) > 0
+        left = self._search(sign, lambda p, q: not p.is_right_of(z) and not visible(p, q))
+        right = self._search(sign, lambda p, q: q.is_left_of(z) or visible(p, q))
+        return (left, right)
+
+    def _edge_at(self, z, sign):
+        '''return the edge (p, q) of the upper (sign=1) or lower (sign=-1) hull whose x-extent contains
+        z's x-coordinate, or None if z lies outside the x-range of the hull'''
+        v = self.root
+        lo = hi = None
+        while v.point is None:
+            p, q = (v.upper if sign > 0 else v.lower)
+            if hi is not None and hi < q:
+                v = v.left
+            elif lo is not None and p < lo:
+                v = v.right
+            elif z.is_left_of(p):
+                hi, v = p, v.left
+            elif z.is_right_of(q):
+                lo, v = q, v.right
+            else:
+                return (p, q)
+        return None
+
+    def visible_edge(self, z):
+        '''return a hull edge (p, q) in CCW order with the Point z strictly to its right, i.e. visible from z,
+        or None if z lies in the closed hull. Within the x-range of the hull, this is the upper or lower edge
+        above or below z; outside it, one of the two edges at the leftmost or rightmost vertex.'''
+        if self.root is None or self.root.point is not None:
+            return None
+
+        for sign in (1, -1):
+            edge = self._edge_at(z, sign)
+            if edge is not None and sign*orient(edge[0], edge[1], z) > 0:
+                return (edge[1], edge[0]) if sign > 0 else edge # the upper hull runs CW from left to right
+
+        left, right = self.extreme(-1, 0), self.extreme(1, 0)
+        for sign in (1, -1):
+            if z.is_left_of(left):
+                p, q = left, self._search(sign, lambda a, b: a == left) # the first edge of the chain
+            elif z.is_right_of(right):
+                p, q = self._search(sign, lambda a, b: b != right), right # the last edge of the chain
+            else:
+                return None
+            if sign > 0:
+                p, q = q, p
+            if cw(p, q, z):
+                return (p, q)
+        return None
+
+    def contains(self, z):
+        '''return True if and only if the Point z lies strictly inside the hull'''
+        if self.root is None or self.root.point is not None:
+            return False
+
+        upper = self._edge_at(z, 1)
+        lower = self._edge_at(z, -1)
+        if upper is None or lower is None:
+            return False
+        return cw(upper[0], upper[1], z) and ccw(lower[0], lower[1], z)
@@ -0,0 +1,67 @@
+import math
+import struct
+
+# event name -> (code, number of Points recorded); the Points of point_located are p, the endpoints
+#   of the segment above it and the visible point on that segment, recorded as NaN if there is none
+EVENTS = {
+    'point_located': (0, 4),
+    'edge_flipped': (1, 4),
+    'segment_added': (2, 2),
+    'segment_removed': (3, 2),
+}
+NAMES = {code: (name, n) for name, (code, n) in EVENTS.items()}
+MAGIC = b'DTEV\x01'
+
+class EventRecorder():
+    '''an observer for Triangulation.subscribe() writing each event to a compact binary log: one byte for
+    the event code followed by the (x, y) coordinates of its Points as little-endian doubles, i.e. 33 bytes
+    per added or removed segment and 65 bytes per located point or flipped edge.
+
+    The log can be replayed with read_events() or turned into an animation with rendering.animate_log(),
+    so a Triangulation can be built at full speed with an EventRecorder and animated later:
+
+        with EventRecorder('task1.log') as rec:
+            T = Triangulation(P, observers=[rec])
+            T.random_incremental()
+            T.naive_delaunay()
+        rendering.animate_log('task1.log', 'task1.gif')
+    '''
+
+    def __init__(self, fname):
+        self.file = open(fname, 'wb')
+        self.file.write(MAGIC)
+        self.formats = {name: struct.Struct('<B{}d'.format(2*n)) for name, (_, n) in EVENTS.items()}
+
+    def __call__(self, event, *args):
+        if event == 'point_located':
+            p, above, above_point = args
+            args = (p,) if above is None else (p, above.p1, above.p2, above_point)
+        coords = []
+        for q in args:
+            coords.append(q.x())
+            coords.append(q.y())
+        coords += [math.nan]*(2*EVENTS[event][1] - len(coords)) # nothing above a point outside the hull
+        self.file.write(self.formats[event].pack(EVENTS[event][0], *coords))
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def read_events(fname):
+    '''yield the events of a log written by an EventRecorder as pairs (event, points), where points is a
+    tuple of (x, y) float pairs in the order recorded'''
+    with open(fname, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError("not an event log: {}".format(fname))
+        while True:
+            code = f.read(1)
+            if not code:
+                return
+            name, n = NAMES[code[0]]
+            coords = struct.unpack('<{}d'.format(2*n), f.read(16*n))
+            yield name, tuple(zip(coords[0::2], coords[1::2]))
@@ -1,4 +1,5 @@
 from primitives import *
+import numpy as np
 
 def graham(P):
     P = sorted(P)
@@ -18,4 +19,73 @@ def graham(P):
             del L[-2]
 
     L.extend(reversed(U[1:-1]))
-    return L
\ No newline at end of file
+    return L
+
+def akl_toussaint(xs, ys):
+    '''given coordinate arrays, return a boolean mask of the points that may lie on the convex hull,
+    discarding those strictly inside the octagon spanned by the extreme points in the x, y, x+y and
+    x-y directions (Akl-Toussaint heuristic)'''
+
+    s, d = xs + ys, xs - ys
+    # extreme points in CCW order around the octagon
+    ext = [np.argmin(xs), np.argmin(s), np.argmin(ys), np.argmax(d), np.argmax(xs), np.argmax(s), np.argmax(ys), np.argmin(d)]
+
+    inside = np.ones(len(xs), dtype=bool)
+    for a, b in zip(ext, ext[1:] + ext[:1]):
+        if xs[a] == xs[b] and ys[a] == ys[b]:
+            continue
+        inside &= (ys - ys[a])*(xs[b] - xs[a]) - (ys[b] - ys[a])*(xs - xs[a]) > 0
+
+    return ~inside
+
+def _chain(xs, ys, idx, sign):
+    '''given indices sorted by (x, y), return the subsequence forming the lower (sign=1) or upper (sign=-1)
+    hull chain, by the stack scan of the monotone chain algorithm: each point pops the points before it
+    that make a strictly wrong turn with it, so the scan takes linear time. Collinear points on the hull
+    are kept, as graham() does.'''
+
+    xs, ys = xs[idx].tolist(), ys[idx].tolist()
+    stack = [] # positions into idx
+    for k in range(len(idx)):
+        xk, yk = xs[k], ys[k]
+        while len(stack) >= 2:
+            i, j = stack[-2], stack[-1]
+            if sign*((yk - ys[i])*(xs[j] - xs[i]) - (ys[j] - ys[i])*(xk - xs[i])) >= 0:
+                break
+            stack.pop()
+        stack.append(k)
+
+    return idx[stack]
+
+def graham_indices(xs, ys):
+    '''given arrays of x- and y-coordinates, return the indices of the points on their convex hull in the
+    same order as graham(): CCW, starting from the lowest of the leftmost points. Points strictly inside the
+    Akl-Toussaint octagon are discarded first, then the survivors are lexsorted and both chains built by
+    a stack scan over them.
+
+    For exact results use integer arrays whose coordinates are below 2**30 in absolute value.'''
+
+    xs = np.asarray(xs)
+    ys = np.asarray(ys)
+    if len(xs) < 3:
+        return np.lexsort((ys, xs))
+
+    cand = np.flatnonzero(akl_toussaint(xs, ys))
+    idx = cand[np.lexsort((ys[cand], xs[cand]))]
+
+    lower = _chain(xs, ys, idx, 1)
+    upper = _chain(xs, ys, idx, -1)
+    return np.concatenate((lower, upper[-2:0:-1]))
+
+def convex_hull(P):
+    '''return the convex hull of the given Points as graham(P) does, using graham_indices() when all
+    points have small integer coordinates so that the vectorized orientation tests are exact'''
+
+    P = list(P)
+    if len(P) >= 3 and all(p._w == 1 and isinstance(p._x, int) and isinstance(p._y, int) for p in P):
+        xs = np.fromiter((p._x for p in P), dtype=np.int64, count=len(P))
+        ys = np.fromiter((p._y for p in P), dtype=np.int64, count=len(P))
+        if np.abs(xs).max() < 2**30 and np.abs(ys).max() < 2**30:
+            return [P[i] for i in graham_indices(xs, ys)]
+
+    return graham(P)
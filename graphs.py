@@ -0,0 +1,167 @@
+import numpy as np
+from arrayutils import expand, distinct, contains
+
+class DelaunayGraph():
+    '''the edges of a Delaunay Triangulation as index arrays, and the proximity graphs contained in it: the
+    Euclidean minimum spanning tree, the relative neighborhood graph (RNG), the Gabriel graph, and an
+    approximation of the k-nearest-neighbor graph. Every graph is returned as an array of indices into
+    self.edges, and EMST <= RNG <= Gabriel <= Delaunay.
+
+    Attributes:
+        xy          (n,2) float coordinates of the vertices, in the order of Triangulation.to_arrays()
+        edges       (m,2) vertex indices of the edges, the smaller one first, sorted
+        d2          (m,) squared lengths of the edges
+        opposite    (m,2) the vertices opposite each edge in its two triangles, or -1 beyond the hull
+        tris        (t,3) CCW vertex indices of the triangles, as in Triangulation.to_arrays()
+        tri_edges   (t,3) the edge opposite each vertex of each triangle
+        indptr, nbrs    the neighbors of vertex v are nbrs[indptr[v]:indptr[v+1]] (compressed sparse rows)
+
+    ASSUMPTION: the triangulation is Delaunay, and its coordinates are small enough (e.g. integers below
+    2^26) for squared distances and dot products to be exact in floating point.'''
+
+    def __init__(self, triangulation):
+        verts, tris, _ = triangulation.to_arrays()
+        self.xy = np.array([(p.x(), p.y()) for p in verts], dtype=np.float64).reshape(-1, 2)
+        n = len(self.xy)
+
+        # every edge appears once in each of its (one or two) triangles, with the opposite vertex
+        a = np.concatenate([tris[:, 1], tris[:, 2], tris[:, 0]])
+        b = np.concatenate([tris[:, 2], tris[:, 0], tris[:, 1]])
+        opp = tris.T.ravel()
+        key = np.minimum(a, b)*n + np.maximum(a, b)
+        order = np.argsort(key, kind='stable')
+        key, opp = key[order], opp[order]
+        first = np.ones(len(key), dtype=bool)
+        first[1:] = key[1:] != key[:-1]
+
+        self.tris = tris
+        self.tri_edges = np.empty(len(key), dtype=np.int64)
+        self.tri_edges[order] = np.cumsum(first) - 1
+        self.tri_edges = self.tri_edges.reshape(3, -1).T.copy()
+
+        self.edges = np.stack([key[first] // n, key[first] % n], axis=1)
+        self.opposite = np.full((len(self.edges), 2), -1, dtype=np.int64)
+        self.opposite[:, 0] = opp[first]
+        self.opposite[np.cumsum(first)[~first] - 1, 1] = opp[~first]
+        self.d2 = self._dist2(self.edges[:, 0], self.edges[:, 1])
+
+        # both directions of every edge, grouped by their first vertex
+        src = np.concatenate([self.edges[:, 0], self.edges[:, 1]])
+        dst = np.concatenate([self.edges[:, 1], self.edges[:, 0]])
+        order = np.argsort(src, kind='stable')
+        self.nbrs = dst[order]
+        self.indptr = np.zeros(n + 1, dtype=np.int64)
+        self.indptr[1:] = np.cumsum(np.bincount(src, minlength=n))
+
+    def _dist2(self, i, j):
+        d = self.xy[i] - self.xy[j]
+        return (d*d).sum(axis=1)
+
+    def _neighbors(self, v):
+        '''return (owner, u): for each i, the neighbors u of v[i] with owner == i'''
+        deg = self.indptr[v + 1] - self.indptr[v]
+        owner, k = expand(deg)
+        return owner, self.nbrs[self.indptr[v][owner] + k]
+
+    def emst(self):
+        '''return the edges of the Euclidean minimum spanning tree (a forest if the triangulation is not
+        connected), by Kruskal's algorithm: the edges by increasing length, skipping those whose endpoints
+        are already connected, as found by a union-find with path halving over an array of parents'''
+        parent = np.arange(len(self.xy)).tolist()
+        def find(v):
+            while parent[v] != v:
+                parent[v] = parent[parent[v]]
+                v = parent[v]
+            return v
+
+        tree = []
+        need = len(self.xy) - 1
+        order = np.argsort(self.d2, kind='stable')
+        for e, u, v in zip(order.tolist(), self.edges[order, 0].tolist(), self.edges[order, 1].tolist()):
+            ru, rv = find(u), find(v)
+            if ru != rv:
+                parent[ru] = rv
+                tree.append(e)
+                if len(tree) == need:
+                    break
+        return np.array(tree, dtype=np.int64)
+
+    def gabriel(self):
+        '''return the edges uv of the Gabriel graph, whose diametral circle contains no vertex. For a Delaunay
+        edge it suffices to test the (at most two) opposite vertices w: w is inside iff the angle uwv is
+        obtuse, i.e. (u-w).(v-w) < 0'''
+        ok = np.ones(len(self.edges), dtype=bool)
+        for j in range(2):
+            w = self.opposite[:, j]
+            has = w >= 0
+            u, v, w = self.edges[has, 0], self.edges[has, 1], w[has]
+            dot = ((self.xy[u] - self.xy[w])*(self.xy[v] - self.xy[w])).sum(axis=1)
+            ok[np.nonzero(has)[0][dot < 0]] = False
+        return np.nonzero(ok)[0]
+
+    def rng(self):
+        '''return the edges uv of the relative neighborhood graph, whose lune (the points closer to both u and
+        v than they are to each other) contains no vertex.
+
+        The lune of uv lies in the disk around its midpoint of radius sqrt(3)/2 |uv|, and the vertices inside
+        any disk are connected in the Delaunay graph (from each vertex, a neighbor is closer to the center, as
+        in Triangulation.nearest_vertex()), so a breadth-first search from u and v over the vertices in that
+        disk finds every vertex of the lune. Only the Gabriel edges are searched, all at once, one level per
+        numpy step, and the search of an edge stops at its first witness; most searches end after a level
+        or two as the disk holds few vertices.'''
+        cand = self.gabriel()
+        u, v = self.edges[cand, 0], self.edges[cand, 1]
+        mid = (self.xy[u] + self.xy[v]) / 2
+        r2 = 0.75*self.d2[cand]*(1 + 1e-12) # include the boundary of the disk, despite rounding
+        n = len(self.xy)
+
+        emptied = np.zeros(len(cand), dtype=bool)
+        fe = np.concatenate([np.arange(len(cand)), np.arange(len(cand))])
+        fv = np.concatenate([u, v])
+        before, last = np.zeros(0, dtype=np.int64), np.sort(fe*n + fv)
+        while len(fe):
+            owner, w = self._neighbors(fv)
+            key = distinct(fe[owner]*n + w)
+            key = key[~(contains(last, key) | contains(before, key))]
+            fe, fv = key // n, key % n
+
+            d = self.xy[fv] - mid[fe]
+            inside = (d*d).sum(axis=1) <= r2[fe]
+            fe, fv, key = fe[inside], fv[inside], key[inside]
+
+            # a witness is strictly closer to both endpoints than they are to each other
+            du, dv = self._dist2(fv, u[fe]), self._dist2(fv, v[fe])
+            witness = np.maximum(du, dv) < self.d2[cand[fe]]
+            emptied[fe[witness]] = True
+            keep = ~emptied[fe]
+            fe, fv = fe[keep], fv[keep]
+            before, last = last, key[keep]
+
+        return cand[~emptied]
+
+    def knn(self, k):
+        '''return (idx, d2): for each vertex its k nearest vertices among its neighbors and their neighbors in
+        the Delaunay graph (the "2-ring") and their squared distances, nearest first, padded with -1 and inf.
+        The nearest two are always exact; further ones are usually but not always among the 2-ring.'''
+        n = len(self.xy)
+        owner, u = self._neighbors(np.arange(n))
+        owner2, w = self._neighbors(u)
+        src = np.concatenate([owner, owner[owner2]])
+        dst = np.concatenate([u, w])
+        key = distinct(src*n + dst)
+        src, dst = key // n, key % n
+        keep = src != dst
+        src, dst = src[keep], dst[keep]
+
+        d2 = self._dist2(src, dst)
+        order = np.lexsort((d2, src))
+        src, dst, d2 = src[order], dst[order], d2[order]
+        start = np.searchsorted(src, np.arange(n))
+        rank = np.arange(len(src)) - start[src]
+        keep = rank < k
+
+        idx = np.full((n, k), -1, dtype=np.int64)
+        dist = np.full((n, k), np.inf)
+        idx[src[keep], rank[keep]] = dst[keep]
+        dist[src[keep], rank[keep]] = d2[keep]
+        return idx, dist
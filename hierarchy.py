@@ -0,0 +1,96 @@
+from primitives import *
+from delaunay import Triangulation
+from graham import convex_hull
+import math
+import random
+
+class DelaunayHierarchy():
+    '''a Delaunay hierarchy (Devillers, 2002) for a triangulation receiving both insertions and queries.
+
+    Level 0 is the Delaunay triangulation of all inserted points, and every point of level i is also kept
+    in level i+1 with probability 1/alpha. Level 0 is built over the convex hull of the initial points; the
+    higher levels are built over a fixed triangle enclosing it (see bounding_triangle()) instead, so that
+    their size only depends on the points sampled into them, even for a large or cocircular hull.
+    A point is located by walking from the coarsest level down, starting at a corner of that triangle: the
+    walk in level i starts at the vertex of the triangle found in level i+1 nearest to the query (other than
+    a corner), which gives expected O(log n) location without knowing any of the future x-coordinates up
+    front (unlike SegmentTree.from_2d_points).
+
+    Attributes:
+        levels      list of Triangulations, levels[0] being the full triangulation
+        level_of    map from each inserted Point to the highest level containing it, so that a
+                    deletion only has to remove the point from levels[0..level_of[p]]
+        corners     the vertices of the triangle enclosing the higher levels
+        random      the random.Random drawing the levels and the walks, seeded with `seed`
+
+    ASSUMPTION: inserted points lie inside the convex hull of the points given to the constructor.'''
+
+    def __init__(self, pts, alpha=30, max_levels=5, seed=None):
+        '''build a hierarchy over the given points, whose convex hull bounds all later insertions'''
+        self.alpha = alpha
+        self.random = random.Random(seed)
+
+        pts = list(pts)
+        hull = convex_hull(pts)
+        self.corners = bounding_triangle(hull)
+        self.levels = [Triangulation(hull, make_legal=True)]
+        self.levels += [Triangulation(self.corners, make_legal=True) for _ in range(max_levels-1)]
+        self.level_of = {}
+        self._base = hull[0] # where walks in level 0 start if level 1 has no vertex near the query
+
+        self.random.shuffle(pts)
+        for p in pts:
+            self.insert(p)
+
+    def _random_level(self):
+        level = 0
+        while level < len(self.levels)-1 and self.random.random() < 1/self.alpha:
+            level += 1
+        return level
+
+    def _descend(self, p, stop=0, insert_up_to=-1):
+        '''walk from the top level down to level `stop`, inserting p into the levels up to `insert_up_to`
+        on the way; return the triangle containing p found in the last level before any insertion'''
+
+        start = self.corners[0]
+        for i in range(len(self.levels)-1, stop-1, -1):
+            T = self.levels[i]
+            tri = T.walk_locate(p, start, self.random)
+
+            # every vertex of level i but the corners is also in level i-1
+            inner = [v for v in tri if v not in self.corners]
+            if inner:
+                start = min(inner, key=lambda v: (v.x()-p.x())**2 + (v.y()-p.y())**2)
+            else:
+                start = self.corners[0] if i > 1 else self._base
+
+            if i <= insert_up_to and p not in T.adj:
+                T.insert_point(p, tri)
+                T.pts.append(p)
+
+        return tri
+
+    def insert(self, p):
+        '''insert the point p into level 0 and into each higher level with probability 1/alpha per level'''
+        if p in self.level_of:
+            return
+
+        level = self._random_level()
+        self.level_of[p] = level
+        self._descend(p, insert_up_to=level)
+
+    def locate(self, p):
+        '''return a triangle (a, b, c) of level 0 in CCW order containing the point p'''
+        return self._descend(p)
+
+    def triangulation(self):
+        '''return the Triangulation of all points inserted so far (level 0)'''
+        return self.levels[0]
+
+def bounding_triangle(pts):
+    '''return three Points with integer coordinates, in CCW order, of a triangle that strictly contains the
+    bounding box of the given points and has no vertical edge'''
+    x0 = math.floor(min(p.x() for p in pts)) - 1
+    y0 = math.floor(min(p.y() for p in pts)) - 1
+    d = max(math.ceil(max(p.x() for p in pts)) - x0, math.ceil(max(p.y() for p in pts)) - y0) + 1
+    return [Point(x0 - 2*d, y0 - 1), Point(x0 + 4*d, y0), Point(x0 + d, y0 + 4*d)]
@@ -0,0 +1,171 @@
+import numpy as np
+from tin import TIN
+from arrayutils import circumcenters, distinct, contains
+
+def _area(px, py, qx, qy, rx, ry):
+    '''return the signed areas of the triangles (p, q, r)'''
+    return ((qx - px)*(ry - py) - (qy - py)*(rx - px)) / 2
+
+class NaturalNeighbor(TIN):
+    '''natural neighbor (Sibson) interpolation of values given at the vertices of a Delaunay Triangulation,
+    which, unlike the linear TIN it extends, is smooth away from the vertices.
+
+    The weight of a vertex p for a query q is the area its Voronoi cell would lose to q if q were inserted.
+    The point q is not inserted: the conflict cavity of q (the triangles whose circumcircle contains it) is
+    found by a breadth-first search from the triangle containing q. The area a vertex a loses is the polygon
+    bounded by the bisector of q and a, from cc(q,u,a) to cc(q,a,w) for the cavity boundary edges ua and aw
+    (cc() being a circumcenter), through the circumcenters of the cavity triangles around a, which are the
+    old Voronoi vertices of a. Its shoelace sum is split over these triangles, so that each cavity triangle
+    (a, b, c) with circumcenter C adds area(m, X_ab, C) + area(m, C, X_ca) to a, where m is the midpoint of
+    q and a, and likewise for b and c. Here X_ab is cc(q,a,b) on a boundary edge. On an edge inside the
+    cavity, X_ab is the midpoint of ab instead: any point on the bisector of ab cancels between the two
+    triangles sharing the edge. cc(q,a,b) would also do in exact arithmetic (Watson's formula), but it goes
+    to infinity as q approaches ab, whereas q stays away from the boundary edges of its cavity, except near
+    a hull edge (see weights()).
+
+    All queries of a batch are processed at once: they are located as in TIN.locate(), every level of
+    the cavity searches is one numpy step, and the circumcenters of the triangles are computed once in
+    the constructor and shared by all queries whose cavities overlap.
+
+    ASSUMPTION: the triangulation is Delaunay (see Triangulation.check_delaunay()).'''
+
+    def __init__(self, triangulation, values, seed=0):
+        super().__init__(triangulation, values, seed)
+
+        a, b, c = (self.xy[self.tris[:, i]] for i in range(3))
+        cx, cy = circumcenters(b[:, 0]-a[:, 0], b[:, 1]-a[:, 1], c[:, 0]-a[:, 0], c[:, 1]-a[:, 1])
+        self.radius2 = cx*cx + cy*cy
+        self.centers = np.stack([cx + a[:, 0], cy + a[:, 1]], axis=1)
+
+    def cavities(self, qx, qy):
+        '''return arrays (q, t) listing each pair of a query index q and a triangle t in the conflict cavity
+        of query q, for the queries inside the hull, in the order found'''
+        q, t, _ = self._cavities(qx, qy)
+        return q, t
+
+    def _conflict(self, q, t, qx, qy):
+        '''return whether the circumcircle of triangle t[i] strictly contains query q[i], for each i'''
+        dx = qx[q] - self.centers[t, 0]
+        dy = qy[q] - self.centers[t, 1]
+        return dx*dx + dy*dy < self.radius2[t]
+
+    def _cavities(self, qx, qy):
+        '''cavities(), also returning the triangle containing each query (see TIN.locate()): the cavity of a
+        query consists of that triangle and the triangles in conflict with the query'''
+        qx = np.asarray(qx, dtype=np.float64).ravel()
+        qy = np.asarray(qy, dtype=np.float64).ravel()
+        m = len(self.tris)
+
+        tri = self.locate(qx, qy)
+        fq = np.nonzero(tri >= 0)[0]
+        ft = tri[fq]
+        found_q, found_t = [fq], [ft] # the triangle containing q is always in conflict with it
+
+        # breadth-first search over the cavities, one level per step: a cavity triangle adjacent to one found
+        # at the last level was found at that level, the level before it, or is new, so only those two levels
+        # have to be remembered
+        before, last = np.zeros(0, dtype=np.int64), np.sort(fq*m + ft)
+        while len(fq):
+            nq = np.repeat(fq, 3)
+            nt = self.nbrs[ft].ravel()
+            keep = nt >= 0
+            key = distinct(nq[keep]*m + nt[keep])
+            key = key[~(contains(last, key) | contains(before, key))]
+            fq, ft = key // m, key % m
+
+            conflict = self._conflict(fq, ft, qx, qy)
+            fq, ft = fq[conflict], ft[conflict]
+            before, last = last, key[conflict]
+            found_q.append(fq)
+            found_t.append(ft)
+
+        return np.concatenate(found_q), np.concatenate(found_t), tri
+
+    def weights(self, xs, ys):
+        '''return arrays (q, v, w) listing for each query q inside the hull its natural neighbors v with their
+        Sibson coordinates w (which sum to 1 for each query); a query on a vertex gets the weight 1 for that
+        vertex, up to rounding'''
+        qx = np.asarray(xs, dtype=np.float64).ravel()
+        qy = np.asarray(ys, dtype=np.float64).ravel()
+        q, t, located = self._cavities(qx, qy)
+
+        # everything relative to the query, which keeps the circumcenters accurate
+        tri = self.tris[t]
+        (ax, ay), (bx, by), (cx, cy) = ((self.xy[tri[:, i], 0] - qx[q], self.xy[tri[:, i], 1] - qy[q]) for i in range(3))
+        ox, oy = self.centers[t, 0] - qx[q], self.centers[t, 1] - qy[q]
+
+        # the edge opposite vertex i is a boundary edge of the cavity unless the triangle across it is in it
+        nb = self.nbrs[t]
+        boundary = []
+        for i in range(3):
+            inner = nb[:, i] >= 0
+            inner[inner] = (nb[inner, i] == located[q[inner]]) | self._conflict(q[inner], nb[inner, i], qx, qy)
+            boundary.append(~inner)
+
+        def point(px, py, rx, ry, on_boundary):
+            '''X for the edges pr: cc(q,p,r) on the boundary, the midpoint of pr inside the cavity'''
+            with np.errstate(divide='ignore', invalid='ignore'):
+                gx, gy = circumcenters(px, py, rx, ry)
+            return np.where(on_boundary, gx, (px + rx)/2), np.where(on_boundary, gy, (py + ry)/2)
+
+        # area(m, X_ab, C) + area(m, C, X_ca) is half the cross product of C - m and X_ca - X_ab
+        xab = point(ax, ay, bx, by, boundary[2])
+        xbc = point(bx, by, cx, cy, boundary[0])
+        xca = point(cx, cy, ax, ay, boundary[1])
+        stolen = np.concatenate([
+            _area(ax/2, ay/2, ox, oy, ax/2 + xca[0] - xab[0], ay/2 + xca[1] - xab[1]), # a
+            _area(bx/2, by/2, ox, oy, bx/2 + xab[0] - xbc[0], by/2 + xab[1] - xbc[1]), # b
+            _area(cx/2, cy/2, ox, oy, cx/2 + xbc[0] - xca[0], cy/2 + xbc[1] - xca[1]), # c
+        ])
+
+        qv = np.concatenate([q, q, q])
+        v = tri.T.ravel()
+
+        # sum the contributions of each (query, vertex) pair, then normalize per query
+        n = len(self.xy)
+        key = qv*n + v
+        order = np.argsort(key)
+        key = key[order]
+        first = np.ones(len(key), dtype=bool)
+        first[1:] = key[1:] != key[:-1]
+        w = np.add.reduceat(stolen[order], np.nonzero(first)[0]) if len(key) else stolen
+        key = key[first]
+        qv, v = key // n, key % n
+        total = np.bincount(qv, weights=w, minlength=len(qx))
+        w = w / total[qv]
+
+        # on a vertex or a hull edge, the Voronoi cell of q is empty or unbounded, and its limit is linear: a
+        #   query on a vertex, or on or too close to a hull edge for its areas to be accurate, is interpolated
+        #   linearly in its triangle instead
+        linear = ~np.isfinite(total)
+        for i, (px, py, rx, ry) in enumerate([(bx, by, cx, cy), (cx, cy, ax, ay), (ax, ay, bx, by)]):
+            hull = nb[:, i] < 0
+            cross = px[hull]*ry[hull] - py[hull]*rx[hull] # |pr| times the distance of q from the edge
+            linear[q[hull][np.abs(cross) <= 1e-9*((px[hull] - rx[hull])**2 + (py[hull] - ry[hull])**2)]] = True
+        if linear.any():
+            keep = ~linear[qv]
+            lq = np.nonzero(linear)[0]
+            ltri, lw = self.barycentric(qx[lq], qy[lq])
+            lq, lv, lw = np.repeat(lq, 3), self.tris[ltri].ravel(), lw.ravel()
+            nonzero = np.abs(lw) > 0
+            qv = np.concatenate([qv[keep], lq[nonzero]])
+            v = np.concatenate([v[keep], lv[nonzero]])
+            w = np.concatenate([w[keep], lw[nonzero]])
+
+        return qv, v, w
+
+    def interpolate(self, xs, ys):
+        '''return the natural neighbor interpolation at the query points, with the shape of xs (followed by
+        the number of channels, if the values have several), and NaN for points outside the hull'''
+        shape = np.shape(xs)
+        qx = np.asarray(xs, dtype=np.float64).ravel()
+        qv, v, w = self.weights(xs, ys)
+
+        channels = self.values.shape[1:]
+        vals = self.values.reshape(len(self.values), -1)
+        out = np.full((len(qx), vals.shape[1]), np.nan)
+        inside = np.zeros(len(qx), dtype=bool)
+        inside[qv] = True
+        for k in range(vals.shape[1]):
+            out[inside, k] = np.bincount(qv, weights=w*vals[v, k], minlength=len(qx))[inside]
+        return out.reshape(shape + channels)
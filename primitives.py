@@ -1,6 +1,6 @@
-import matplotlib.pyplot as plt
 from functools import total_ordering
 import math
+import threading
 from enum import Enum
 
 class IntersLoc(Enum):
@@ -110,23 +110,16 @@ class Point(object):
         '''return point as Cartesian coordinates as floats'''
         return (self.x(), self.y())
     
-    def draw(self,color='black', fig=plt, text=None):
+    def draw(self,color='black', fig=None, text=None):
         '''draw the point with the provided color. If text is not None, it is drawn near the point.'''
-        if text is not None:
-            plt.annotate(str(text), (self.x(),self.y()))
+        import rendering
+        rendering.draw_point(self, color=color, fig=fig, text=text)
 
-        fig.plot(self.x(), self.y(), color=color, marker="o")
-
-    def draw_edge(self, other_point, color='black', fig=plt, arrow=True):
+    def draw_edge(self, other_point, color='black', fig=None, arrow=True):
         '''draw an edge from this point to the provided point.
         if arrow=True then an arrowhead at the other point is drawn'''
-        xs = [self.x(), other_point.x()]
-        ys = [self.y(), other_point.y()]
-        
-        if arrow:
-            fig.annotate("", xy=(other_point.x(), other_point.y()), xytext=(self.x(), self.y()), arrowprops=dict(facecolor=color, headwidth=10, headlength=10, width=0.1, linewidth=0))
-
-        fig.plot(xs, ys, color=color, marker='o', linestyle="--")
+        import rendering
+        rendering.draw_point_edge(self, other_point, color=color, fig=fig, arrow=arrow)
 
     def translate(self, x=0, y=0, w=None):
         '''return this point translated right and up by given x and y values'''
@@ -207,13 +200,9 @@ class Segment(object):
     def __hash__(self):
         return self.p1.__hash__() + self.p2.__hash__()
 
-    def draw(self,fig=plt, color='grey', arrow=False):
-        xs = [self.p1.x(), self.p2.x()]
-        ys = [self.p1.y(), self.p2.y()]
-        if arrow:
-            fig.annotate("", xy=(self.p2.x(), self.p2.y()), xytext=(self.p1.x(), self.p1.y()), arrowprops=dict(headwidth=7, headlength=7, width=0.1, linewidth=0.0, color=color))
-        
-        fig.plot(xs, ys, color=color, marker='', linestyle="-")
+    def draw(self,fig=None, color='grey', arrow=False):
+        import rendering
+        rendering.draw_segment(self, fig=fig, color=color, arrow=arrow)
 
     def support(self):
         '''return a line supporting this segment'''
@@ -337,13 +326,9 @@ class Line(Segment):
     def __init__(self, p1, p2):
         Segment.__init__(self, p1, p2)
 
-    def draw(self,fig=plt,color='black',dashed=False):
-        if dashed:
-            dashes = (1,1)
-        else:
-            dashes = (None, None)
-
-        fig.axline(self.p1.p(), self.p2.p(), dashes=dashes, color=color)
+    def draw(self,fig=None,color='black',dashed=False):
+        import rendering
+        rendering.draw_line(self, fig=fig, color=color, dashed=dashed)
 
     def intersect(self, other):
         '''returns whether this line intersects the given line'''
@@ -369,9 +354,9 @@ class Circle(object):
         c = center.translate(0, radius)
         return cls(a,b,c)
 
-    def draw(self,fig=plt, color='steelblue'):        
-        circle1 = plt.Circle((self.center.x(), self.center.y()), self.radius, edgecolor=color, facecolor="none")
-        fig.gca().add_patch(circle1)
+    def draw(self,fig=None, color='steelblue'):
+        import rendering
+        rendering.draw_circle(self, fig=fig, color=color)
 
     def _compute_center_radius(self):
         # source: https://math.stackexchange.com/a/3503338
@@ -401,26 +386,9 @@ class Circle(object):
         return self.center
 
     def in_circle(self, point):
-        # TODO: Make robust with arbitrary-precision arithmetic
-
-        a = self._a
-        b = self._b
-        c = self._c
-        d = point
-                    
-        m = [
-            [a.x() - d.x(), a.y() - d.y(), (a.x()-d.x())**2 + (a.y()-d.y())**2],
-            [b.x() - d.x(), b.y() - d.y(), (b.x()-d.x())**2 + (b.y()-d.y())**2],
-            [c.x() - d.x(), c.y() - d.y(), (c.x()-d.x())**2 + (c.y()-d.y())**2],
-        ]
-    
-        m1d = m[1][1]*m[2][2] - m[1][2]*m[2][1]
-        m2d = m[1][0]*m[2][2] - m[1][2]*m[2][0]
-        m3d = m[1][0]*m[2][1] - m[1][1]*m[2][0]
-
-        d3 = m[0][0] * m1d - m[0][1] * m2d + m[0][2] * m3d
-    
-        return d3 > 0
+        '''return True if and only if the point lies strictly inside this circle, whose three defining
+        points are expected in CCW order (see incircle())'''
+        return incircle(self._a, self._b, self._c, point) > 0
     
 class Triangle(object):
     
@@ -435,9 +403,9 @@ class Triangle(object):
         self._b = b
         self._c = c
 
-    def draw(self,fig=plt,color='grey'):
-        triangle = plt.Polygon([self._a.p(), self._b.p(), self._c.p()], facecolor=color)
-        fig.gca().add_patch(triangle)
+    def draw(self,fig=None,color='grey'):
+        import rendering
+        rendering.draw_triangle(self, fig=fig, color=color)
 
     def circum(self):
         return Circle(self._a,self._b,self._c)
@@ -457,8 +425,18 @@ class Triangle(object):
     def to_tuple(self):
         return (self._a, self._b, self._c)
 
+class _PredicateCounts(threading.local):
+    '''the counters that orient() and incircle() add 1 to in the current thread: None, or a dict with the
+    keys 'orient' and 'in_circle', set by stats.Stats while a measured Triangulation is at work'''
+    counts = None
+
+predicate_counts = _PredicateCounts()
+
 def orient(p, q, r):
     '''returns 0 if pqr are collinear, <0 if triangle pqr is CCW, >0 if triangle pqr is CW.'''
+    counts = predicate_counts.counts
+    if counts is not None:
+        counts['orient'] += 1
     wp = p._w
     wq = q._w
     wr = r._w
@@ -479,6 +457,41 @@ def collinear(a,b,c):
     '''returns True if and only if two given points are equal OR all three are distinct and collinear'''
     return orient(a,b,c) == 0
 
+def incircle(a, b, c, d):
+    '''returns >0 if d lies strictly inside the circle through the CCW triangle a,b,c, 0 if the four points are
+    cocircular and <0 if d lies outside. Computed exactly: the usual 3x3 determinant of the rows
+    (ax-dx, ay-dy, (ax-dx)^2+(ay-dy)^2) with each row scaled by the square of its common denominator.'''
+    counts = predicate_counts.counts
+    if counts is not None:
+        counts['in_circle'] += 1
+    rows = []
+    for p in (a, b, c):
+        w = p._w*d._w
+        dx = p._x*d._w - d._x*p._w
+        dy = p._y*d._w - d._y*p._w
+        rows.append((dx*w, dy*w, dx*dx + dy*dy))
+    (a0, a1, a2), (b0, b1, b2), (c0, c1, c2) = rows
+    return a0*(b1*c2 - b2*c1) - a1*(b0*c2 - b2*c0) + a2*(b0*c1 - b1*c0)
+
+def circumcenter(a, b, c):
+    '''returns the center of the circle through the non-collinear points a,b,c as an exact Point, computed
+    from integer coordinates scaled to the common denominator of the three points'''
+    w = a._w*b._w*c._w
+    ax, ay = a._x*b._w*c._w, a._y*b._w*c._w
+    bx, by = b._x*a._w*c._w - ax, b._y*a._w*c._w - ay
+    cx, cy = c._x*a._w*b._w - ax, c._y*a._w*b._w - ay
+    d = 2*(bx*cy - by*cx)
+    b2, c2 = bx*bx + by*by, cx*cx + cy*cy
+    return Point(ax*d + cy*b2 - by*c2, ay*d + bx*c2 - cx*b2, d*w)
+
+def closer(p, q, r):
+    '''returns True if and only if p is strictly closer to r than q is, comparing the squared distances exactly'''
+    def dist2(a):
+        dx = a._x*r._w - r._x*a._w
+        dy = a._y*r._w - r._y*a._w
+        return dx*dx + dy*dy # times (a._w*r._w)^2
+    return dist2(p)*q._w*q._w < dist2(q)*p._w*p._w
+
 def collinear_in_order(a,b,c):
     '''returns True if and only if a,b,c are distinct, collinear, and appear in that order on the line'''
     if not collinear(a,b,c):
@@ -490,6 +503,17 @@ def collinear_in_order(a,b,c):
     
     return (a._x*nwa - b._x*nwb)*(b._x*nwb - c._x*nwc) + (a._y*nwa - b._y*nwb)*(b._y*nwb - c._y*nwc) > 0
 
+def y_at(seg, p):
+    '''given a non-vertical segment and a point p, return a pair (num, den) with den > 0 such that
+    num/den is the y-coordinate of the line supporting seg at p's x-coordinate. Using the pair,
+    heights can be compared exactly by cross-multiplying, without creating intermediate Points.'''
+    l, r = seg.left, seg.right
+    dx = r._x*l._w - l._x*r._w
+    dy = r._y*l._w - l._y*r._w
+    num = l._y*p._w*dx + dy*(p._x*l._w - l._x*p._w)
+    den = p._w*l._w*dx
+    return num, den
+
 def distance_to(self, other):
     return ( (self.x()-other.x())**2 + (self.y() - other.y())**2)**0.5
 
@@ -0,0 +1,156 @@
+import numpy as np
+import struct
+import zlib
+from arrayutils import chunks, distinct, expand
+
+# anchor colors of the viridis colormap, interpolated linearly by colormap()
+VIRIDIS = np.array([
+    (68, 1, 84), (72, 40, 120), (62, 74, 137), (49, 104, 142), (38, 130, 142),
+    (31, 158, 137), (53, 183, 121), (110, 206, 88), (181, 222, 43), (253, 231, 37),
+], dtype=np.float64)
+
+def colormap(values, vmin=None, vmax=None, anchors=VIRIDIS):
+    '''map an array of scalars to an (..., 3) uint8 array of colors, linearly from vmin to vmax (default:
+    the range of the values) along the given anchor colors'''
+    values = np.asarray(values, dtype=np.float64)
+    vmin = np.nanmin(values) if vmin is None else vmin
+    vmax = np.nanmax(values) if vmax is None else vmax
+    t = (values - vmin) / (vmax - vmin) if vmax > vmin else np.zeros_like(values)
+    t = np.clip(np.nan_to_num(t), 0, 1) * (len(anchors) - 1)
+    i = np.minimum(t.astype(np.int64), len(anchors) - 2)
+    f = (t - i)[..., None]
+    return np.rint(anchors[i]*(1-f) + anchors[i+1]*f).astype(np.uint8)
+
+def to_pixels(xy, width, height=None, margin=0.02):
+    '''return the (n,2) float pixel coordinates (column, row; row 0 at the top) of the points xy scaled
+    uniformly to fit a width x height image, and the image height (by default, from the aspect ratio)'''
+    xy = np.asarray(xy, dtype=np.float64)
+    lo, hi = xy.min(axis=0), xy.max(axis=0)
+    span = np.maximum(hi - lo, 1e-300)
+    if height is None:
+        height = max(1, int(round(width * span[1] / span[0])))
+
+    inner = np.array([width, height]) * (1 - 2*margin)
+    scale = np.min(inner / span)
+    offset = (np.array([width, height]) - scale*span) / 2
+    px = (xy - lo)*scale + offset
+    px[:, 1] = height - px[:, 1]
+    return px, height
+
+def fill_triangles(img, px, tris, color=None, values=None, vmin=None, vmax=None, limit=1<<22):
+    '''fill the triangles (an (m,3) array of indices into the pixel coordinates px) in the (h,w,3) image img,
+    coloring the pixels whose centers lie in a triangle either with `color` or, given one value per vertex,
+    with colormap() of the linearly interpolated value.
+
+    Every triangle is expanded to the pixels of its bounding box at once with the repeat trick, at most
+    about `limit` pixels per step, and the pixels are tested against its three edge functions.'''
+    h, w = img.shape[:2]
+    tris = np.asarray(tris, dtype=np.int64).reshape(-1, 3)
+    if values is not None:
+        values = np.asarray(values, dtype=np.float64)
+        vmin = np.nanmin(values) if vmin is None else vmin
+        vmax = np.nanmax(values) if vmax is None else vmax
+
+    a, b, c = px[tris[:, 0]], px[tris[:, 1]], px[tris[:, 2]]
+    tx = np.stack([a[:, 0], b[:, 0], c[:, 0]], axis=1)
+    ty = np.stack([a[:, 1], b[:, 1], c[:, 1]], axis=1)
+
+    # the pixels i whose centers i+0.5 lie in the bounding box, clipped to the image
+    x0 = np.clip(np.ceil(tx.min(axis=1) - 0.5), 0, w).astype(np.int64)
+    x1 = np.clip(np.floor(tx.max(axis=1) - 0.5), -1, w-1).astype(np.int64)
+    y0 = np.clip(np.ceil(ty.min(axis=1) - 0.5), 0, h).astype(np.int64)
+    y1 = np.clip(np.floor(ty.max(axis=1) - 0.5), -1, h-1).astype(np.int64)
+    bw = np.maximum(x1 - x0 + 1, 0)
+    bh = np.maximum(y1 - y0 + 1, 0)
+    det = (b[:, 0]-a[:, 0])*(c[:, 1]-a[:, 1]) - (b[:, 1]-a[:, 1])*(c[:, 0]-a[:, 0])
+    sizes = np.where(det != 0, bw*bh, 0)
+
+    for part in chunks(sizes, limit):
+        t, k = expand(sizes[part])
+        t += part.start
+        x = x0[t] + k % bw[t]
+        y = y0[t] + k // bw[t]
+        cx, cy = x + 0.5, y + 0.5
+
+        # barycentric coordinates of the pixel centers
+        l1 = ((c[t, 0]-cx)*(a[t, 1]-cy) - (c[t, 1]-cy)*(a[t, 0]-cx)) / det[t]
+        l2 = ((a[t, 0]-cx)*(b[t, 1]-cy) - (a[t, 1]-cy)*(b[t, 0]-cx)) / det[t]
+        l0 = 1 - l1 - l2
+        inside = (l0 >= 0) & (l1 >= 0) & (l2 >= 0)
+
+        t, x, y = t[inside], x[inside], y[inside]
+        if values is None:
+            img[y, x] = color
+        else:
+            v = l0[inside]*values[tris[t, 0]] + l1[inside]*values[tris[t, 1]] + l2[inside]*values[tris[t, 2]]
+            img[y, x] = colormap(v, vmin, vmax)
+
+def draw_lines(img, p, q, color, limit=1<<22):
+    '''draw the segments from the pixel coordinates p[i] to q[i] (arrays of shape (k,2)) into the image img,
+    sampling each segment once per pixel along its major axis (a vectorized DDA)'''
+    h, w = img.shape[:2]
+    d = q - p
+    sizes = np.ceil(np.abs(d).max(axis=1)).astype(np.int64) + 1
+
+    for part in chunks(sizes, limit):
+        e, k = expand(sizes[part])
+        e += part.start
+        s = (k / np.maximum(sizes[e] - 1, 1))[:, None]
+        xy = np.floor(p[e] + s*d[e]).astype(np.int64)
+        ok = (xy[:, 0] >= 0) & (xy[:, 0] < w) & (xy[:, 1] >= 0) & (xy[:, 1] < h)
+        img[xy[ok, 1], xy[ok, 0]] = color
+
+def edges_of(tris):
+    '''return the (k,2) array of the distinct edges of the triangles, as sorted pairs of vertex indices'''
+    tris = np.asarray(tris, dtype=np.int64).reshape(-1, 3)
+    e = np.concatenate([tris[:, [0, 1]], tris[:, [1, 2]], tris[:, [2, 0]]])
+    e.sort(axis=1)
+    n = int(tris.max()) + 1 if len(tris) else 1
+    key = distinct(e[:, 0]*n + e[:, 1])
+    return np.stack([key // n, key % n], axis=1)
+
+def rasterize(xy, tris, width=1024, height=None, values=None, wireframe=None, margin=0.02, vmin=None, vmax=None,
+              background=(255, 255, 255), fill_color=(211, 211, 211), edge_color=(128, 128, 128)):
+    '''return an (h,w,3) uint8 image of the triangles (an (m,3) array of indices into the (n,2) coordinates xy).
+    Given one value per vertex (e.g. the elevation of Mt Bruno), the triangles are filled by colormap() of
+    the interpolated value, otherwise with fill_color; the edges are drawn on top if `wireframe` is True,
+    which is the default when no values are given.'''
+    px, height = to_pixels(xy, width, height, margin)
+    img = np.empty((height, width, 3), dtype=np.uint8)
+    img[:] = background
+
+    if wireframe is None:
+        wireframe = values is None
+    if values is not None or not wireframe:
+        fill_triangles(img, px, tris, fill_color, values, vmin, vmax)
+    if wireframe:
+        e = edges_of(tris)
+        draw_lines(img, px[e[:, 0]], px[e[:, 1]], edge_color)
+    return img
+
+def write_png(fname, img, level=6):
+    '''write an (h,w,3) RGB or (h,w) grayscale uint8 image as a PNG file, using zlib at the given compression level'''
+    img = np.ascontiguousarray(img, dtype=np.uint8)
+    h, w = img.shape[:2]
+    color_type = 2 if img.ndim == 3 else 0
+
+    raw = np.zeros((h, 1 + img[0].size), dtype=np.uint8) # every row starts with filter type 0 (none)
+    raw[:, 1:] = img.reshape(h, -1)
+
+    def chunk(tag, data):
+        return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff)
+
+    with open(fname, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n')
+        f.write(chunk(b'IHDR', struct.pack('>IIBBBBB', w, h, 8, color_type, 0, 0, 0)))
+        f.write(chunk(b'IDAT', zlib.compress(raw.tobytes(), level)))
+        f.write(chunk(b'IEND', b''))
+
+def render(T, fname, values=None, **kwargs):
+    '''rasterize the bounded triangles of the Triangulation T (see rasterize()) into the PNG file fname;
+    `values`, if given, maps each vertex of T to its value'''
+    verts, tris, _ = T.to_arrays()
+    xy = np.array([(p.x(), p.y()) for p in verts], dtype=np.float64).reshape(-1, 2)
+    if values is not None:
+        values = np.array([values[p] for p in verts], dtype=np.float64)
+    write_png(fname, rasterize(xy, tris, values=values, **kwargs))
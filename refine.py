@@ -0,0 +1,165 @@
+import heapq
+import itertools
+import math
+from primitives import Point, Segment, circumcenter, incircle, cw
+
+def encroaches(p, a, b):
+    '''returns True if and only if the point p lies strictly inside the diametral circle of the segment ab,
+    i.e. the angle apb is obtuse, tested exactly'''
+    ax, ay = a._x*p._w - p._x*a._w, a._y*p._w - p._y*a._w
+    bx, by = b._x*p._w - p._x*b._w, b._y*p._w - p._y*b._w
+    return (ax*bx + ay*by)*a._w*b._w < 0
+
+def midpoint(a, b):
+    '''returns the exact midpoint of the points a and b'''
+    return Point(a._x*b._w + b._x*a._w, a._y*b._w + b._y*a._w, 2*a._w*b._w)
+
+class Refiner():
+    '''Delaunay refinement (Ruppert's algorithm, with Chew's and Shewchuk's improvements) of a Triangulation
+    until no triangle has an angle below min_angle or an area above max_area, by inserting Steiner points:
+    the circumcenters of the bad triangles, and the midpoints of the hull edges they would encroach upon.
+
+    The bad triangles are kept in a priority queue, worst first, validated lazily: an entry whose triangle is
+    no longer a face is dropped when popped, and only the triangles created by an insertion (those incident
+    to the new vertex) are measured and pushed, so the mesh is never rescanned after the constructor.
+    Before a circumcenter c is inserted, the triangles whose circumcircle contains it (the triangles its
+    insertion replaces) are searched from the bad triangle for hull edges on their boundary that c encroaches
+    upon or lies beyond; if there are any, they are split at their midpoints instead, and the triangle (if it
+    survives) is reconsidered afterwards. Otherwise c is located by walk_locate() from a vertex of the bad triangle and
+    inserted with insert_point(). Hull edges encroached upon by an existing vertex (only the vertex opposite
+    the edge needs to be tested in a Delaunay triangulation) are split first, by split_hull_edge().
+
+    Circumcenters are rounded to multiples of 1/resolution, which keeps their coordinates small; midpoints
+    are exact, so that they stay on the hull. The smallest angle of a triangle between two hull edges (at
+    a sharp corner of the hull) cannot be improved, and is ignored.
+
+        T = Triangulation(P, make_legal=True)
+        T.random_incremental()
+        Refiner(T, min_angle=25, max_area=100).run()
+
+    ASSUMPTION: T is Delaunay (make_legal=True) and has no segment tree (use_tree=False), whose elementary
+    intervals only cover the x-coordinates of the original points.'''
+
+    def __init__(self, T, min_angle=20.0, max_area=None, resolution=1<<16):
+        if not T.make_legal or T.tree is not None:
+            raise ValueError("refinement needs a Triangulation with make_legal=True and use_tree=False")
+        self.T = T
+        self.sin2 = math.sin(math.radians(min_angle))**2
+        self.max_area = max_area
+        self.resolution = resolution
+        self.steiner = 0 # Steiner points inserted so far
+
+        self.heap = []
+        self._counter = itertools.count()
+        self.segments = [] # hull edges to test for encroachment
+        verts, tris, _ = T.to_arrays()
+        for t in tris.tolist():
+            self._schedule(tuple(verts[v] for v in t))
+        self.segments.extend((s.p1, s.p2) for s in T.hull_edges)
+
+    def badness(self, tri):
+        '''return how bad the CCW triangle tri is: the larger of sin^2(min_angle)/sin^2 of its smallest angle
+        and its area/max_area, so that a triangle is bad if and only if this exceeds 1'''
+        (ax, ay), (bx, by), (cx, cy) = ((p.x(), p.y()) for p in tri)
+        cross = (bx - ax)*(cy - ay) - (by - ay)*(cx - ax)
+        edges = sorted([((bx-cx)**2 + (by-cy)**2, 0), ((cx-ax)**2 + (cy-ay)**2, 1), ((ax-bx)**2 + (ay-by)**2, 2)])
+
+        # the smallest angle lies opposite the shortest edge; sin^2 of it is cross^2/(product of the others)
+        bad = 0.0
+        k = edges[0][1]
+        corner = Segment(tri[k], tri[(k+1)%3]) in self.T.hull_edges and Segment(tri[k], tri[(k+2)%3]) in self.T.hull_edges
+        if not corner:
+            bad = self.sin2*edges[1][0]*edges[2][0]/(cross*cross)
+        if self.max_area is not None:
+            bad = max(bad, cross/2/self.max_area)
+        return bad
+
+    def _schedule(self, tri):
+        bad = self.badness(tri)
+        if bad > 1:
+            heapq.heappush(self.heap, (-bad, next(self._counter), tri))
+
+    def _circumcenter(self, tri):
+        '''return the circumcenter of tri rounded to the resolution, or None if the rounding moved it out of the
+        circumcircle or onto a vertex (for a triangle too small for the resolution)'''
+        c = circumcenter(*tri)
+        r = self.resolution
+        c = Point((2*c._x*r + c._w)//(2*c._w), (2*c._y*r + c._w)//(2*c._w), r)
+        if c in self.T.adj or incircle(*tri, c) <= 0:
+            return None
+        return c
+
+    def _blocking_segments(self, c, tri):
+        '''return the hull edges (as pairs of points) on the boundary of the triangles whose circumcircle
+        contains c, searched from tri, that c encroaches upon or lies beyond'''
+        T = self.T
+        found = []
+        seen = {frozenset(tri)}
+        stack = [tri]
+        while stack:
+            t = stack.pop()
+            for i in range(3):
+                u, v = t[i], t[(i+1)%3]
+                if Segment(u, v) in T.hull_edges:
+                    if encroaches(c, u, v) or cw(u, v, c):
+                        found.append((u, v))
+                    continue
+                w = T.get_ccw_neighbor(v, u) # the triangle (v, u, w) across the edge uv
+                key = frozenset((u, v, w))
+                if key not in seen:
+                    seen.add(key)
+                    if incircle(v, u, w, c) > 0:
+                        stack.append((v, u, w))
+        return found
+
+    def _split(self, a, b):
+        '''split the hull edge ab at its midpoint, and queue the new triangles and hull edges'''
+        T = self.T
+        m = midpoint(a, b)
+        T.split_hull_edge(a, b, m)
+        self.steiner += 1
+        for t in T.incident_triangles(m):
+            self._schedule(t)
+        self.segments.extend(((a, m), (m, b)))
+
+    def _encroached(self, a, b):
+        '''return True if the hull edge ab is encroached upon by the vertex opposite it'''
+        T = self.T
+        c = T.get_ccw_neighbor(a, b)
+        if not T.is_triangle(a, b, c):
+            c = T.get_ccw_neighbor(b, a)
+        return encroaches(c, a, b)
+
+    def run(self, max_points=None):
+        '''insert Steiner points until no triangle is bad or max_points of them were inserted, and return self'''
+        T = self.T
+        while max_points is None or self.steiner < max_points:
+            if self.segments:
+                a, b = self.segments.pop()
+                if Segment(a, b) in T.hull_edges and self._encroached(a, b):
+                    self._split(a, b)
+                continue
+
+            if not self.heap:
+                break
+            entry = heapq.heappop(self.heap)
+            tri = entry[2]
+            if not T.is_triangle(*tri):
+                continue
+            c = self._circumcenter(tri)
+            if c is None:
+                continue
+
+            blocking = self._blocking_segments(c, tri)
+            if blocking:
+                for a, b in blocking:
+                    if Segment(a, b) in T.hull_edges:
+                        self._split(a, b)
+                heapq.heappush(self.heap, entry)
+                continue
+
+            T.insert_point(c, T.walk_locate(c, tri[0]))
+            self.steiner += 1
+            for t in T.incident_triangles(c):
+                self._schedule(t)
+        return self
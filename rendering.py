@@ -0,0 +1,286 @@
+# Drawing routines for the primitives and Triangulation. This module is imported lazily by their
+#   .draw() methods (and Triangulation.show_plot()/save_plot()), so computing never loads matplotlib.
+#   The optional `fig` argument defaults to matplotlib.pyplot.
+
+import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
+import tempfile
+import io
+
+def draw_point(p, color='black', fig=None, text=None):
+    '''draw the point with the provided color. If text is not None, it is drawn near the point.'''
+    if fig is None:
+        fig = plt
+    if text is not None:
+        plt.annotate(str(text), (p.x(),p.y()))
+
+    fig.plot(p.x(), p.y(), color=color, marker="o", zorder=3)
+
+def draw_point_edge(p, other_point, color='black', fig=None, arrow=True):
+    '''draw an edge from p to the provided point.
+    if arrow=True then an arrowhead at the other point is drawn'''
+    if fig is None:
+        fig = plt
+    xs = [p.x(), other_point.x()]
+    ys = [p.y(), other_point.y()]
+
+    if arrow:
+        fig.annotate("", xy=(other_point.x(), other_point.y()), xytext=(p.x(), p.y()), arrowprops=dict(facecolor=color, headwidth=10, headlength=10, width=0.1, linewidth=0))
+
+    fig.plot(xs, ys, color=color, marker='o', linestyle="--")
+
+def draw_segment(s, fig=None, color='grey', arrow=False):
+    if fig is None:
+        fig = plt
+    xs = [s.p1.x(), s.p2.x()]
+    ys = [s.p1.y(), s.p2.y()]
+    if arrow:
+        fig.annotate("", xy=(s.p2.x(), s.p2.y()), xytext=(s.p1.x(), s.p1.y()), arrowprops=dict(headwidth=7, headlength=7, width=0.1, linewidth=0.0, color=color))
+
+    fig.plot(xs, ys, color=color, marker='', linestyle="-")
+
+def draw_line(line, fig=None, color='black', dashed=False):
+    if fig is None:
+        fig = plt
+    if dashed:
+        dashes = (1,1)
+    else:
+        dashes = (None, None)
+
+    fig.axline(line.p1.p(), line.p2.p(), dashes=dashes, color=color)
+
+def draw_circle(circle, fig=None, color='steelblue'):
+    if fig is None:
+        fig = plt
+    circle1 = plt.Circle((circle.center.x(), circle.center.y()), circle.radius, edgecolor=color, facecolor="none")
+    fig.gca().add_patch(circle1)
+
+def draw_triangle(tri, fig=None, color='grey'):
+    if fig is None:
+        fig = plt
+    a, b, c = tri.to_tuple()
+    triangle = plt.Polygon([a.p(), b.p(), c.p()], facecolor=color)
+    fig.gca().add_patch(triangle)
+
+def draw_edges(segs, color='gray', fig=None):
+    '''draw the segments given as pairs ((x1, y1), (x2, y2)) as a single LineCollection'''
+    if fig is None:
+        fig = plt
+    ax = fig.gca()
+    ax.add_collection(LineCollection(segs, colors=color))
+    ax.autoscale_view()
+
+def draw_points(xs, ys, color='black', fig=None):
+    '''draw the points with the given coordinates as a single scatter, above any edges'''
+    if fig is None:
+        fig = plt
+    fig.scatter(xs, ys, color=color, marker='o', s=36, zorder=2.5)
+    fig.gca().autoscale_view()
+
+def draw_triangulation(T):
+    '''draw the edges of T as one LineCollection and its points as one scatter'''
+    draw_edges([((s.p1.x(), s.p1.y()), (s.p2.x(), s.p2.y())) for s in T.edges])
+    draw_points([p.x() for p in T.pts], [p.y() for p in T.pts])
+
+class FrameWriter():
+    '''writes frames one at a time to an animation file, so no frame is kept in memory: a GIF (fname ending
+    in .gif) is encoded frame by frame with PIL, anything else (e.g. .mp4) is handed to matplotlib's
+    FFMpegWriter, which needs ffmpeg installed. `pause` is the number of seconds per frame.'''
+
+    def __init__(self, fname, pause=1.0, dpi=100):
+        self.fname = fname
+        self.pause = pause
+        self.dpi = dpi
+        self.count = 0
+        self.gif = fname.lower().endswith('.gif')
+        if self.gif:
+            self.file = open(fname, 'wb')
+        else:
+            from matplotlib.animation import FFMpegWriter
+            self.movie = FFMpegWriter(fps=1/pause)
+
+    def grab(self, fig=None):
+        '''append the current figure (or fig) as the next frame'''
+        if fig is None:
+            fig = plt.gcf()
+        if self.gif:
+            from PIL import Image
+            buf = io.BytesIO()
+            fig.savefig(buf, format='png', dpi=self.dpi)
+            buf.seek(0)
+            self.add_image(Image.open(buf))
+        else:
+            if self.count == 0:
+                self.movie.setup(fig, self.fname, dpi=self.dpi)
+            self.movie.grab_frame()
+            self.count += 1
+
+    def add_image(self, im):
+        '''append a PIL image as the next frame of a GIF'''
+        from PIL import Image, GifImagePlugin
+        im = im.convert('RGB').convert('P', palette=Image.ADAPTIVE)
+        if self.count == 0:
+            header, _ = GifImagePlugin.getheader(im, info={'loop': 0}) # 0 for infinite loop
+            self.file.write(b''.join(header))
+        self.file.write(b''.join(GifImagePlugin.getdata(im, duration=int(self.pause*1000), include_color_table=True)))
+        self.count += 1
+
+    def close(self):
+        if self.gif:
+            self.file.write(b';') # GIF trailer
+            self.file.close()
+        elif self.count > 0:
+            self.movie.finish()
+
+class FrameSpool():
+    '''frames of a Triangulation with SAVE_TO_GIF=True whose output file is not known yet: each frame is
+    appended as a PNG to an anonymous temporary file, until save_to() streams them into a FrameWriter'''
+
+    def __init__(self):
+        self.file = tempfile.TemporaryFile()
+        self.sizes = []
+
+    def __len__(self):
+        return len(self.sizes)
+
+    def grab(self, fig=None):
+        if fig is None:
+            fig = plt.gcf()
+        start = self.file.tell()
+        fig.savefig(self.file, format='png')
+        self.sizes.append(self.file.tell() - start)
+
+    def save_to(self, writer):
+        from PIL import Image
+        self.file.seek(0)
+        for size in self.sizes:
+            writer.add_image(Image.open(io.BytesIO(self.file.read(size))))
+        self.file.seek(0, 2)
+
+def _set_limits(T, margin):
+    try:
+        T.min_x
+    except AttributeError:
+        T.min_x = min(p.x() for p in T.hull_pts)
+        T.max_x = max(p.x() for p in T.hull_pts)
+        T.min_y = min(p.y() for p in T.hull_pts)
+        T.max_y = max(p.y() for p in T.hull_pts)
+        T.dx = (margin-1)*(T.max_x - T.min_x)
+        T.dy = (margin-1)*(T.max_y - T.min_y)
+
+    plt.axis([T.min_x-T.dx, T.max_x+T.dx, T.min_y-T.dy, T.max_y+T.dy])
+    plt.gca().set_aspect('equal')
+
+def show_plot(T, margin=1.05):
+    '''if T.SAVE_TO_GIF, append the current figure in plt as a frame to T.FRAMES (the FrameWriter opened by
+    stream_to(), or else a FrameSpool) and clear it, otherwise display it as normal'''
+    _set_limits(T, margin)
+    if T.SAVE_TO_GIF:
+        if T.FRAMES is None:
+            T.FRAMES = FrameSpool()
+        T.FRAMES.grab()
+        plt.clf()
+    else:
+        plt.show()
+
+def stream_to(T, fname, pause=1.0):
+    '''send the frames of T.show_plot() straight to the animation file fname, starting with any frames
+    spooled so far (which requires a GIF)'''
+    writer = FrameWriter(fname, pause)
+    if isinstance(T.FRAMES, FrameSpool) and len(T.FRAMES) > 0:
+        if not writer.gif:
+            raise ValueError("frames drawn before stream_to() can only be written to a GIF: {}".format(fname))
+        T.FRAMES.save_to(writer)
+    T.SAVE_TO_GIF = True
+    T.FRAMES = writer
+
+def save_plot(T, fname, pause=1.0):
+    '''finish the animation of T: close the FrameWriter opened by stream_to(), or stream the frames spooled
+    so far into a GIF named fname'''
+    if not T.SAVE_TO_GIF or T.FRAMES is None:
+        return
+    if isinstance(T.FRAMES, FrameWriter):
+        T.FRAMES.close()
+    else:
+        writer = FrameWriter(fname, pause)
+        T.FRAMES.save_to(writer)
+        writer.close()
+
+class PlotObserver():
+    '''an observer for Triangulation.subscribe() that draws a frame of T with T.show_plot() when a point is
+    located, when an edge is flipped and when a hull edge is added (Triangulation(..., DRAW=True))'''
+
+    def __init__(self, T):
+        self.T = T
+
+    def __call__(self, event, *args):
+        from primitives import Segment, Circle
+        T = self.T
+
+        if event == 'point_located':
+            p, above, above_point = args
+            T.draw()
+            if above is not None: # None if p lies outside the convex hull
+                draw_segment(above, color='darkorange')
+                draw_point(above_point, color='orange')
+            if above_point is not None and p != above_point:
+                draw_segment(Segment(p, above_point), color='black', arrow=True)
+            draw_point(p, color='red')
+            T.show_plot()
+
+        elif event == 'edge_flipped':
+            a, b, c, d = args
+            T.draw()
+            draw_circle(Circle(a, b, c))
+            draw_segment(Segment(a, b), color='red')
+            draw_segment(Segment(c, d), color='green')
+            for v in (a, b, c, d):
+                draw_point(v, color='darkorange')
+            T.show_plot()
+
+        elif event == 'segment_added' and Segment(*args) in T.hull_edges:
+            T.draw()
+            draw_segment(Segment(*args), color='black')
+            T.show_plot()
+
+def animate_log(log, fname, pause=1.0, margin=1.05):
+    '''replay an event log written by events.EventRecorder into the animation fname (see FrameWriter), drawing a
+    frame whenever a point was located or an edge flipped, like PlotObserver but without the Triangulation
+    that produced the log'''
+    from events import read_events
+
+    min_x = min_y = float('inf')
+    max_x = max_y = -float('inf')
+    for _, pts in read_events(log):
+        for x, y in pts:
+            min_x, max_x = min(min_x, x), max(max_x, x)
+            min_y, max_y = min(min_y, y), max(max_y, y)
+    dx, dy = (margin-1)*(max_x - min_x), (margin-1)*(max_y - min_y)
+
+    writer = FrameWriter(fname, pause)
+    edges = {}
+    for event, pts in read_events(log):
+        if event == 'segment_added':
+            edges[frozenset(pts)] = pts
+            continue
+        if event == 'segment_removed':
+            del edges[frozenset(pts)]
+            continue
+
+        draw_edges(list(edges.values()))
+        if event == 'point_located':
+            p, a, b, hit = pts
+            draw_edges([(a, b)], color='darkorange')
+            draw_points([hit[0]], [hit[1]], color='orange')
+            draw_points([p[0]], [p[1]], color='red')
+        else:
+            a, b, c, d = pts
+            draw_edges([(a, b)], color='red')
+            draw_edges([(c, d)], color='green')
+
+        plt.axis([min_x-dx, max_x+dx, min_y-dy, max_y+dy])
+        plt.gca().set_aspect('equal')
+        writer.grab()
+        plt.clf()
+
+    writer.close()
@@ -1,4 +1,25 @@
 from primitives import *
+from array import array
+from bisect import bisect_left, bisect_right
+
+def lowest_above(segs, p : Point, vertical_line, above_seg=None, above_point=None):
+    '''given an iterable of segments, a point p and the vertical line through p, return the pair
+    (above_seg, above_point) where `above_seg` is the lowest of the given segments that contains p or
+    is visible upwards from p, and `above_point` the point on it visible from p (p itself if contained).
+    A current best pair can be passed in, which is returned if none of the segments is lower.'''
+
+    for s in segs:
+        if s.contains_point(p):
+            return (s, p)
+
+        inters = vertical_line.intersect_segment(s)
+        if inters is not None:
+            if inters.is_above(p) or inters.equal_y(p):
+                if above_point is None or inters.is_below(above_point):
+                    above_seg = s
+                    above_point = inters
+
+    return (above_seg, above_point)
 
 class SegmentTreeAuxSet(): # slower because just using set and not balanced AVL
     '''a class to be used at every node of a SegmentTree to store its segments.
@@ -34,28 +55,9 @@ class SegmentTreeAuxSet(): # slower because just using set and not balanced AVL
 
         assert(self.interval.contains_1d_point(p.x_proj())) # verify the given point's x-coordinate lies in this set's assigned interval
 
-        above_seg = None
-        above_point = None
-        
-        vertical_line = p.vertical_line_thru()
-
-        for s in self.segs:
-            if s.contains_point(p):
-                above_seg = s
-                above_point = p
-                break
-            else:
-                inters = vertical_line.intersect_segment(s)
-                if inters is not None:
-                    if s.contains_point(inters):
-                        if inters.is_above(p) or inters.equal_y(p):
-                            if above_point is None or inters.is_below(above_point):
-                                above_seg = s
-                                above_point = inters
-
         # TODO: Implement this method (Task 3)
 
-        return (above_seg, above_point)
+        return lowest_above(self.segs, p, p.vertical_line_thru())
 
 class SegmentTree():
 
@@ -138,30 +140,20 @@ class SegmentTree():
             - Two OneDPoint objects' x-coordinates can be compared using <, <=, ==, >, >=.'''
 
         above_seg, above_point = None, None
-
-        retminim = float('inf')
         vertical_line = p.vertical_line_thru()
-        for s in self.aux.get_segs():
-            if s.contains_point(p):
-                above_seg = s
-                above_point = p
-            intersection = vertical_line.intersect_segment(s)
-            if intersection:
-                if intersection.y() > p.y() and intersection.y() < retminim:
-                    retminim = intersection.y()
-                    above_seg = s
-                    above_point = intersection
+        x = p.x_proj()
 
-        if self.left and p.x_proj() <= self.split:
-            left_seg, left_point = self.left.vertical_shoot(p)
-            if left_seg and left_point.y() < retminim:
-                above_seg, above_point = left_seg, left_point
-                retminim = left_point.y()
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            above_seg, above_point = lowest_above(node.aux.get_segs(), p, vertical_line, above_seg, above_point)
+            if above_point is p: # p lies on a segment, nothing can be lower
+                break
 
-        if self.right and p.x_proj() >= self.split:
-            right_seg, right_point = self.right.vertical_shoot(p)
-            if right_seg and right_point.y() < retminim:
-                above_seg, above_point = right_seg, right_point
+            if node.left and x <= node.split:
+                stack.append(node.left)
+            if node.right and x >= node.split:
+                stack.append(node.right)
 
         # TODO: Complete for Task 3
 
@@ -171,34 +163,80 @@ class SegmentTree():
         '''returns the set of all Segments in this SegmentTree `stabbed` by the
         vertical line through the given query point q; i.e., all Segments
         that contain q's x-coordinate.'''
+        return set(self.iter_stabbed(q))
+
+    def iter_stabbed(self, q):
+        '''yield each Segment stabbed by the vertical line through q exactly once,
+        without building any intermediate sets.
+
+        A segment is stored at several canonical nodes, and two of them may share q's x-coordinate
+        as a boundary. A node whose interval starts at q's x-coordinate therefore skips segments that
+        extend further left, as those are reported by the node covering the interval ending there.'''
+
+        x = q.x_proj()
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if x < node.interval.left or node.interval.right < x:
+                continue
+
+            at_left = (x == node.interval.left)
+            for s in node.aux.get_segs():
+                if not (at_left and s.left.x_proj() < x):
+                    yield s
+
+            if node.left:
+                stack.append(node.right)
+                stack.append(node.left)
+
+    def stabbing_query_many(self, qs):
+        '''given a list of query points, return a list whose i-th entry is the list of Segments stabbed
+        by the vertical line through qs[i]. The queries are sorted by x-coordinate and answered in a single
+        traversal of the tree, each node handing the contiguous run of queries in its interval to its children.'''
+
+        order = sorted(range(len(qs)), key=lambda i: qs[i].x_proj())
+        xs = [qs[i].x_proj() for i in order]
+        ret = [[] for _ in qs]
+
+        stack = [(self, bisect_left(xs, self.interval.left), bisect_right(xs, self.interval.right))]
+        while stack:
+            node, i, j = stack.pop()
+            if i >= j:
+                continue
+
+            segs = node.aux.get_segs()
+            if segs:
+                for k in range(i, j):
+                    x = xs[k]
+                    at_left = (x == node.interval.left)
+                    out = ret[order[k]]
+                    for s in segs:
+                        if not (at_left and s.left.x_proj() < x):
+                            out.append(s)
+
+            if node.left:
+                stack.append((node.left, i, bisect_right(xs, node.split, i, j)))
+                stack.append((node.right, bisect_left(xs, node.split, i, j), j))
 
-        ret = set()
-
-        if q.x_proj() < self.interval.left or q.x_proj() > self.interval.right:
-            return ret
-        
-        ret = self.aux.get_segs()
-
-        if self.left:
-            ret = ret.union(self.left.stabbing_query(q))
-
-        if self.right:
-            ret = ret.union(self.right.stabbing_query(q))
-        
         return ret
 
     def gather(self):
         '''return a set of all segments stored in this subtree'''
-        ret = self.aux.get_segs()
-        
-        if self.left:
-            ret = ret.union(self.left.gather())
-        
-        if self.right:
-            ret = ret.union(self.right.gather())
+        return set(self.iter_segments())
+
+    def iter_segments(self):
+        '''yield each segment stored in this subtree exactly once, namely at its leftmost canonical node'''
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            for s in node.aux.get_segs():
+                if s.left.x_proj() == node.interval.left:
+                    yield s
+
+            if node.left:
+                stack.append(node.right)
+                stack.append(node.left)
 
-        return ret
-        
     def draw_stabbing_query(self, q):
         all_segs = self.gather()
         stabbed = self.stabbing_query(q)
@@ -260,8 +298,193 @@ class SegmentTree():
         if self.right:
             self.right.draw(depth+1, top)
 
+class FlatSegmentTree():
+    '''an implicit, heap-indexed segment tree over a sorted list of distinct 1d points.
+
+    Node 1 is the root and node i has children 2i and 2i+1. Rather than a node object per interval,
+    node i covers [xs[lo[i]], xs[hi[i]]] where lo and hi are compact integer arrays, and its segments
+    are kept in aux[i] (None until a segment is stored there). Like SegmentTree, the median point
+    belongs to both children and the leaves are the elementary intervals [xs[j], xs[j+1]].
+
+    ASSUMPTION: the endpoints of every inserted segment are among the x-coordinates of the tree.'''
+
+    @classmethod
+    def from_2d_points(cls, points):
+        '''return a FlatSegmentTree built over the x-coordinates of the given points'''
+
+        x_coords = sorted(set(p.x_proj() for p in points))
+        return cls(x_coords)
+
+    def __init__(self, x_coords):
+        '''build an empty segment tree on the given sorted list of 1d points, x_coords, in O(n) time and memory'''
+        assert(len(x_coords) >= 2)
+
+        self.pts = x_coords
+        self.index = {x: i for i, x in enumerate(x_coords)} # 1d point -> position in self.pts
+        self.interval = Interval(x_coords[0], x_coords[-1])
+
+        size = 1
+        while size < len(x_coords) - 1:
+            size *= 2
+        size *= 2 # heap indices of a tree with len(x_coords)-1 leaves are below 2*size
+
+        self.lo = array('i', [0])*size
+        self.hi = array('i', [0])*size
+        self.aux = [None]*size
+
+        self.lo[1], self.hi[1] = 0, len(x_coords) - 1
+        stack = [1]
+        while stack:
+            v = stack.pop()
+            lo, hi = self.lo[v], self.hi[v]
+            if hi - lo > 1:
+                mid = (lo + hi)//2
+                self.lo[2*v], self.hi[2*v] = lo, mid
+                self.lo[2*v+1], self.hi[2*v+1] = mid, hi
+                stack.append(2*v)
+                stack.append(2*v+1)
+
+    def _extent(self, seg):
+        '''return the positions in self.pts of the x-coordinates of the endpoints of the given segment'''
+        return self.index[seg.left.x_proj()], self.index[seg.right.x_proj()]
+
+    def _canonical_nodes(self, seg):
+        '''yield the canonical nodes of the given non-vertical segment, i.e., the highest nodes
+        whose interval is contained in the segment's x-extent'''
+        l, r = self._extent(seg)
+        stack = [1]
+        while stack:
+            v = stack.pop()
+            lo, hi = self.lo[v], self.hi[v]
+            if l <= lo and hi <= r:
+                yield v
+            elif l < hi and lo < r: # segment overlaps the interior of this node's interval
+                stack.append(2*v)
+                stack.append(2*v+1)
+
+    def _stabbed_nodes(self, x):
+        '''yield the nodes whose (closed) interval contains the given 1d point x'''
+        if x < self.pts[0] or self.pts[-1] < x:
+            return
+
+        stack = [1]
+        while stack:
+            v = stack.pop()
+            yield v
+
+            lo, hi = self.lo[v], self.hi[v]
+            if hi - lo > 1:
+                split = self.pts[(lo + hi)//2]
+                if x <= split:
+                    stack.append(2*v)
+                if split <= x:
+                    stack.append(2*v+1)
+
+    def insert(self, seg : Segment):
+        '''Given a non-vertical segment, insert it into the auxiliary sets of its canonical nodes.'''
+
+        assert not seg.is_vertical(), "Only non-vertical segments can be inserted."
+
+        for v in self._canonical_nodes(seg):
+            if self.aux[v] is None:
+                self.aux[v] = set()
+            self.aux[v].add(seg)
+
+    def delete(self, seg : Segment):
+        '''given a non-vertical segment, delete it from the auxiliary sets of its canonical nodes'''
+
+        for v in self._canonical_nodes(seg):
+            self.aux[v].remove(seg)
+            if not self.aux[v]:
+                self.aux[v] = None
+
+    def vertical_shoot(self, p : Point):
+        '''given a point p, return the segment of this tree that either contains p OR the lowest
+        segment visible upwards from p, and the visible point on that segment. If the segment contains p,
+        the visible point is p itself. If there is no such segment, return (None, None).'''
+
+        above_seg, above_point = None, None
+        vertical_line = p.vertical_line_thru()
+
+        for v in self._stabbed_nodes(p.x_proj()):
+            if self.aux[v] is None:
+                continue
+            above_seg, above_point = lowest_above(self.aux[v], p, vertical_line, above_seg, above_point)
+            if above_point is p:
+                break
+
+        return (above_seg, above_point)
+
+    def stabbing_query(self, q):
+        '''returns the set of all Segments in this tree `stabbed` by the vertical line through the
+        given query point q; i.e., all Segments that contain q's x-coordinate.'''
+        return set(self.iter_stabbed(q))
+
+    def iter_stabbed(self, q):
+        '''yield each Segment stabbed by the vertical line through q exactly once, without building
+        any intermediate sets (see SegmentTree.iter_stabbed() for how duplicates are skipped)'''
+
+        x = q.x_proj()
+        for v in self._stabbed_nodes(x):
+            if self.aux[v] is None:
+                continue
+
+            at_left = (x == self.pts[self.lo[v]])
+            for s in self.aux[v]:
+                if not (at_left and s.left.x_proj() < x):
+                    yield s
+
+    def stabbing_query_many(self, qs):
+        '''given a list of query points, return a list whose i-th entry is the list of Segments stabbed
+        by the vertical line through qs[i], answering all queries in a single traversal of the tree'''
+
+        order = sorted(range(len(qs)), key=lambda i: qs[i].x_proj())
+        xs = [qs[i].x_proj() for i in order]
+        ret = [[] for _ in qs]
+
+        stack = [(1, bisect_left(xs, self.pts[0]), bisect_right(xs, self.pts[-1]))]
+        while stack:
+            v, i, j = stack.pop()
+            if i >= j:
+                continue
+
+            lo, hi = self.lo[v], self.hi[v]
+            segs = self.aux[v]
+            if segs is not None:
+                left = self.pts[lo]
+                for k in range(i, j):
+                    x = xs[k]
+                    at_left = (x == left)
+                    out = ret[order[k]]
+                    for s in segs:
+                        if not (at_left and s.left.x_proj() < x):
+                            out.append(s)
+
+            if hi - lo > 1:
+                split = self.pts[(lo + hi)//2]
+                stack.append((2*v, i, bisect_right(xs, split, i, j)))
+                stack.append((2*v+1, bisect_left(xs, split, i, j), j))
+
+        return ret
+
+    def gather(self):
+        '''return a set of all segments stored in this tree'''
+        return set(self.iter_segments())
+
+    def iter_segments(self):
+        '''yield each segment stored in this tree exactly once, namely at its leftmost canonical node'''
+        for v, segs in enumerate(self.aux):
+            if segs is None:
+                continue
+
+            left = self.pts[self.lo[v]]
+            for s in segs:
+                if s.left.x_proj() == left:
+                    yield s
+
 if __name__=='__main__':
     from delaunay import *
+    import matplotlib.pyplot as plt
     import random
 
     random.seed(290)
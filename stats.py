@@ -0,0 +1,128 @@
+import primitives
+import json
+import time
+
+COUNTERS = ('orient', 'in_circle', 'inserts', 'locates', 'location_steps', 'flips', 'tree_inserts', 'tree_deletes')
+PHASES = ('hull', 'location', 'legalization', 'locator')
+
+class Stats():
+    '''opt-in counters and wall-clock timers for the construction of Triangulations.
+
+    Counters:
+        orient, in_circle       calls of primitives.orient() (also through ccw(), cw(), ...) and of
+                                primitives.incircle() (also through Circle.in_circle()) made by the
+                                measured Triangulations
+        inserts, locates        calls of insert_point() and of its point location
+        location_steps          the work done by point location: edges scanned by naive_ray_shoot(),
+                                segment tree nodes visited, or 3 for a triangle known in advance
+        flips                   edge flips, by legalize() or naive_delaunay()
+        tree_inserts/_deletes   segment tree updates
+
+    Phase timers (seconds):
+        hull            computing the convex hull, including updates of a DynamicHull
+        location        point location
+        legalization    legalize() and naive_delaunay(), including the updates they make to the tree
+        locator         segment tree updates
+
+    A Triangulation is measured by passing this object as its `stats` argument, which shadows the methods
+    above on that instance only (see attach()). While one of these wrappers runs, it points the
+    thread-local primitives.predicate_counts at this Stats, so that the predicates are counted for this
+    instance and thread only. Nothing is wrapped otherwise, so a Triangulation without stats only pays a
+    None check per predicate.
+
+        stats = Stats()
+        T = Triangulation(P, use_tree=True, make_legal=True, stats=stats)
+        T.random_incremental()
+        print(stats.to_json())
+    '''
+
+    def __init__(self):
+        self.counts = dict.fromkeys(COUNTERS, 0)
+        self.times = dict.fromkeys(PHASES, 0.0)
+        self._depth = dict.fromkeys(PHASES, 0)
+
+    # ----- triangulations -----
+
+    def _wrap(self, obj, name, phase=None, counter=None):
+        '''shadow the method `name` of obj by a wrapper adding 1 to `counter`, timing `phase` and counting
+        the predicates it evaluates; nested calls within the same phase (e.g. the recursion of legalize())
+        are timed once'''
+        method = getattr(obj, name)
+        counts, times, depth = self.counts, self.times, self._depth
+        clock = time.perf_counter
+        hook = primitives.predicate_counts
+
+        def wrapper(*args, **kwargs):
+            if counter is not None:
+                counts[counter] += 1
+            outer = hook.counts
+            hook.counts = counts
+            try:
+                if phase is None or depth[phase] > 0:
+                    return method(*args, **kwargs)
+                depth[phase] += 1
+                start = clock()
+                try:
+                    return method(*args, **kwargs)
+                finally:
+                    times[phase] += clock() - start
+                    depth[phase] -= 1
+            finally:
+                hook.counts = outer
+
+        setattr(obj, name, wrapper)
+
+    def attach(self, T):
+        '''measure the Triangulation T, whose constructor calls this before computing the hull'''
+        counts = self.counts
+
+        self._wrap(T, 'compute_hull', 'hull')
+        self._wrap(T, 'visible_chain', 'hull')
+        self._wrap(T, '_update_hull', 'hull')
+        self._wrap(T, 'insert_point', counter='inserts')
+        self._wrap(T, 'legalize', 'legalization')
+        self._wrap(T, 'naive_delaunay', 'legalization')
+        self._wrap(T, 'flip', counter='flips')
+
+        # count the location steps of each method before timing the location itself; the segment tree counts
+        #   the nodes it visits in `visited`, of which only those visited by _locate() are location steps, not
+        #   those of other queries of the tree, e.g. by nearest_vertex()
+        visited = [0]
+        if T.tree:
+            stabbed_nodes = T.tree._stabbed_nodes
+            def counting_stabbed_nodes(x):
+                for v in stabbed_nodes(x):
+                    visited[0] += 1
+                    yield v
+            T.tree._stabbed_nodes = counting_stabbed_nodes
+
+            self._wrap(T.tree, 'insert', 'locator', 'tree_inserts')
+            self._wrap(T.tree, 'delete', 'locator', 'tree_deletes')
+
+        locate = T._locate
+        def counting_locate(p, tri=None):
+            if tri is not None:
+                counts['location_steps'] += 3
+            elif not T.tree:
+                counts['location_steps'] += len(T.edges)
+            before = visited[0]
+            try:
+                return locate(p, tri)
+            finally:
+                counts['location_steps'] += visited[0] - before
+        T._locate = counting_locate
+        self._wrap(T, '_locate', 'location', 'locates')
+
+    # ----- export -----
+
+    def to_dict(self):
+        '''return the counters, the phase times and the average location steps per located point'''
+        locates = self.counts['locates']
+        return {
+            'counts': dict(self.counts),
+            'times': dict(self.times),
+            'location_steps_per_locate': self.counts['location_steps']/locates if locates else 0.0,
+        }
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.to_dict(), **kwargs)
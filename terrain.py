@@ -0,0 +1,146 @@
+import heapq
+import itertools
+import numpy as np
+from delaunay import Triangulation
+from primitives import Point
+from arrayutils import chunks, expand
+
+class TerrainSimplifier():
+    '''greedy insertion simplification of gridded elevation data (Garland and Heckbert, "Fast polygonal
+    approximation of terrains and height fields", 1995): starting from the boundary of the grid, repeatedly
+    insert the sample with the largest vertical error with respect to the current Delaunay triangulation,
+    until the error or the number of vertices reaches a budget.
+
+    Sample (i, j) lies at the point (i + j^2/s, j + i^2/s), with s the square of the largest grid dimension:
+    the perturbation hack of delaunay_demo.py, so that no two samples share an x-coordinate and no sample
+    lies on a hull edge. The hull consists of the samples of the first row and the first column and the
+    last corner, and is triangulated by the Triangulation constructor. (The perturbed grid is not exactly
+    convex, which is why the initial mesh is the hull rather than the two corner triangles.)
+
+    Every triangle of the mesh caches its worst sample: the samples of each new triangle are scanned once,
+    row by row with the repeat trick, and the one farthest from the plane through its vertices is pushed on
+    a heap with its error. The heap is validated lazily: an entry whose triangle is no longer a face of the
+    mesh is dropped when popped. The sample is inserted into the triangle found by walk_locate() from one of
+    its vertices, which is exact and also handles samples lying on an edge. As all triangles created by an
+    insertion are incident to the new vertex, only those are scanned again.
+
+        S = TerrainSimplifier(z)
+        S.run(max_error=1.0, max_vertices=10000)
+        i, j, zs, tris = S.mesh()
+
+    Attributes:
+        z       (rows, cols) elevations
+        T       the current Triangulation (make_legal=True)
+        index   the flat index into z of every vertex of T'''
+
+    def __init__(self, z, limit=1<<22):
+        self.z = np.asarray(z, dtype=np.float64)
+        self.rows, self.cols = self.z.shape
+        self.s = max(self.rows, self.cols)**2
+        self.limit = limit # samples scanned per numpy step
+
+        i = np.arange(self.rows)
+        j = np.arange(self.cols)
+        border = set(zip(i.tolist(), [0]*self.rows)) | set(zip([0]*self.cols, j.tolist())) | {(self.rows-1, self.cols-1)}
+        self.index = {}
+        pts = [self.point(a*self.cols + b) for a, b in sorted(border)]
+        self.T = Triangulation(pts, make_legal=True)
+
+        self.heap = []
+        self._counter = itertools.count()
+        for tri in self.triangles():
+            self._schedule(tri)
+
+    def point(self, k):
+        '''return the Point of the sample with flat index k, and remember its index'''
+        i, j = divmod(k, self.cols)
+        p = Point(self.s*i + j*j, self.s*j + i*i, self.s)
+        self.index[p] = k
+        return p
+
+    def _coords(self, i, j):
+        return i + j*j/self.s, j + i*i/self.s
+
+    def triangles(self):
+        '''return the triangles of the current mesh as CCW tuples of Points'''
+        verts, tris, _ = self.T.to_arrays()
+        return [tuple(verts[v] for v in t) for t in tris.tolist()]
+
+    def _scan(self, tri):
+        '''return (error, k): the largest vertical error of the samples in the closed triangle tri (a CCW
+        tuple of Points) and the flat index of such a sample, or (0.0, -1) if it contains no sample but
+        its vertices'''
+        ks = [self.index[p] for p in tri]
+        vi, vj = np.divmod(np.array(ks), self.cols)
+        vx, vy = self._coords(vi.astype(np.float64), vj.astype(np.float64))
+        vz = self.z[vi, vj]
+
+        # the y-range of the triangle over the slab i <= x < i+1 of each row i, from the edges crossing
+        # its sides and the vertices inside it, widened by one sample for the perturbation
+        rows = np.arange(int(vi.min()), int(vi.max()) + 1)
+        lo = np.full(len(rows), np.inf)
+        hi = np.full(len(rows), -np.inf)
+        for e in range(3):
+            x0, y0, x1, y1 = vx[e], vy[e], vx[(e+1)%3], vy[(e+1)%3]
+            for t in (rows, rows + 1.0):
+                t = np.clip(t, min(x0, x1), max(x0, x1))
+                y = y0 + (y1 - y0)*(t - x0)/(x1 - x0) if x1 != x0 else np.full(len(rows), (y0 + y1)/2)
+                lo, hi = np.minimum(lo, y), np.maximum(hi, y)
+        j0 = np.clip(np.floor(lo).astype(np.int64) - 1, 0, self.cols)
+        j1 = np.clip(np.floor(hi).astype(np.int64) + 1, -1, self.cols - 1)
+        sizes = np.maximum(j1 - j0 + 1, 0)
+
+        area = (vx[1]-vx[0])*(vy[2]-vy[0]) - (vy[1]-vy[0])*(vx[2]-vx[0])
+        best, best_k = 0.0, -1
+        for part in chunks(sizes, self.limit):
+            r, m = expand(sizes[part])
+            r += part.start
+            i, j = rows[r], j0[r] + m
+            x, y = self._coords(i.astype(np.float64), j.astype(np.float64))
+
+            # barycentric coordinates, kept if the sample is in the closed triangle
+            l1 = ((vx[2]-x)*(vy[0]-y) - (vy[2]-y)*(vx[0]-x)) / area
+            l2 = ((vx[0]-x)*(vy[1]-y) - (vy[0]-y)*(vx[1]-x)) / area
+            l0 = 1 - l1 - l2
+            inside = (l0 >= 0) & (l1 >= 0) & (l2 >= 0) & ~np.isin(i*self.cols + j, ks)
+            if not inside.any():
+                continue
+            err = np.abs(self.z[i, j] - (l0*vz[0] + l1*vz[1] + l2*vz[2]))
+            err[~inside] = -1
+            w = int(np.argmax(err))
+            if err[w] > best:
+                best, best_k = float(err[w]), int(i[w])*self.cols + int(j[w])
+        return best, best_k
+
+    def _schedule(self, tri):
+        err, k = self._scan(tri)
+        if k >= 0:
+            heapq.heappush(self.heap, (-err, next(self._counter), tri, k))
+
+    def error(self):
+        '''return the largest vertical error of the current mesh, dropping stale heap entries'''
+        while self.heap and not self.T.is_triangle(*self.heap[0][2]):
+            heapq.heappop(self.heap)
+        return -self.heap[0][0] if self.heap else 0.0
+
+    def run(self, max_error=0.0, max_vertices=None):
+        '''insert the worst samples until the largest vertical error is at most max_error or the mesh has
+        max_vertices vertices, and return self'''
+        T = self.T
+        while self.error() > max_error:
+            if max_vertices is not None and len(T.adj) >= max_vertices:
+                break
+            _, _, tri, k = heapq.heappop(self.heap)
+            p = self.point(k)
+            T.insert_point(p, T.walk_locate(p, tri[0]))
+            for t in T.incident_triangles(p):
+                self._schedule(t)
+        return self
+
+    def mesh(self):
+        '''return (i, j, z, tris): the grid indices and elevations of the vertices of the current mesh and
+        its CCW triangles, as arrays of vertex indices'''
+        verts, tris, _ = self.T.to_arrays()
+        k = np.array([self.index[p] for p in verts], dtype=np.int64)
+        i, j = np.divmod(k, self.cols)
+        return i, j, self.z[i, j], tris
@@ -0,0 +1,41 @@
+import random
+import numpy as np
+from primitives import Point
+from delaunay import Triangulation
+from alpha_shape import AlphaFiltration, outlines
+
+def test_alpha_complexes_match_definition():
+    random.seed(46)
+    n = 200
+    P = [Point(x, y) for x, y in zip(random.sample(range(3000), n), random.sample(range(3000), n))]
+    T = Triangulation(P, make_legal=True)
+    T.random_incremental()
+    A = AlphaFiltration(T)
+    xy, tris, edges = A.xy, A.tris, A.edges
+
+    # circumradii, and the edges whose diametral circle is empty, by brute force
+    a, b, c = (xy[tris[:, i]] for i in range(3))
+    la, lb, lc = (np.hypot(*(q - p).T) for p, q in ((b, c), (c, a), (a, b)))
+    area2 = (b[:, 0]-a[:, 0])*(c[:, 1]-a[:, 1]) - (b[:, 1]-a[:, 1])*(c[:, 0]-a[:, 0])
+    radius = la*lb*lc / (2*area2)
+    u, v = xy[edges[:, 0]], xy[edges[:, 1]]
+    empty = np.array([not (((p - xy)*(q - xy)).sum(axis=1) < 0).any() for p, q in zip(u, v)])
+    half = np.hypot(*(v - u).T) / 2
+
+    values = A.critical_values()
+    for alpha in np.quantile(values, [0.1, 0.3, 0.5, 0.7, 0.9]):
+        in_tris, in_edges, boundary = A.alpha_shape(alpha)
+        expected = radius <= alpha*(1 + 1e-12)
+        assert np.array_equal(np.sort(in_tris), np.nonzero(expected)[0])
+
+        # an edge is in the complex if its diametral circle is empty and small enough, or with a triangle
+        with_tri = np.zeros(len(edges), dtype=bool)
+        with_tri[A.tri_edges[expected].ravel()] = True
+        assert np.array_equal(np.sort(in_edges), np.nonzero((empty & (half <= alpha)) | with_tri)[0])
+
+        # the outlines run with the shape on their left and enclose exactly its triangles
+        area = 0.0
+        for polygon in outlines(boundary):
+            x, y = xy[polygon, 0], xy[polygon, 1]
+            area += (x*np.roll(y, -1) - np.roll(x, -1)*y).sum() / 2
+        assert np.isclose(area, area2[expected].sum() / 2)
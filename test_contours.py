@@ -0,0 +1,46 @@
+import random
+import numpy as np
+from primitives import Point
+from delaunay import Triangulation
+from tin import TIN
+from contours import contours
+
+def mesh(n, size, seed):
+    random.seed(seed)
+    P = [Point(x, y) for x, y in zip(random.sample(range(size), n), random.sample(range(size), n))]
+    T = Triangulation(P, make_legal=True)
+    T.random_incremental()
+    verts, _, _ = T.to_arrays()
+    return T, np.array([(p.x(), p.y()) for p in verts], dtype=np.float64)
+
+def test_contours_of_linear_data():
+    T, xy = mesh(150, 1000, 48)
+    f = lambda p: 3*p[..., 0] - 2*p[..., 1] + 5
+    tin = TIN(T, f(xy))
+    levels = [1500.5, -700.25, 10.5]
+    out = contours(tin, levels)
+    assert len(out) == len(levels)
+
+    for level, lines in zip(levels, out):
+        # a level line of a linear function crosses the convex hull once, from hull edge to hull edge
+        assert len(lines) == 1
+        line = lines[0]
+        assert np.allclose(f(line), level, rtol=0, atol=1e-9*abs(level) + 1e-9)
+
+        # the gradient (3,-2) points to the left of every segment
+        d = np.diff(line, axis=0)
+        d = d[np.hypot(*d.T) > 0]
+        assert (-d[:, 1]*3 + d[:, 0]*(-2) > 0).all()
+
+def test_closed_contours_run_ccw_around_peaks():
+    T, xy = mesh(300, 1000, 480)
+    tin = TIN(T, -np.hypot(*(xy - 500).T))
+    levels = [-100.5, -250.5]
+    for level, lines in zip(levels, contours(tin, levels)):
+        assert len(lines) == 1
+        line = lines[0]
+        assert (line[0] == line[-1]).all()
+        x, y = line[:, 0], line[:, 1]
+        assert (x[:-1]*y[1:] - x[1:]*y[:-1]).sum() > 0 # CCW around the peak at (500, 500)
+        r = np.hypot(*(line - 500).T)
+        assert (np.abs(r + level) < 60).all()
@@ -0,0 +1,73 @@
+import random
+import pytest
+from primitives import Point, Segment
+from delaunay import Triangulation, sample_integer_points
+from graham import convex_hull
+
+def hull_edges(P):
+    h = convex_hull(P)
+    return set(Segment(h[i], h[(i+1)%len(h)]) for i in range(len(h)))
+
+def test_insert_outside_hull():
+    random.seed(32)
+    P = sample_integer_points(60, xoffset=100, yoffset=100) # coordinates in [500, 800)
+    T = Triangulation(P, make_legal=True, dynamic_hull=True)
+    T.random_incremental()
+
+    # left and right of the x-range of the hull, above and below it, and far enough to see most of it
+    outside = [Point(10, 650), Point(1390, 640), Point(655, 1300), Point(645, 5), Point(-9000, -9001)]
+    for p in outside:
+        P.append(p)
+        T.insert_point(p)
+        assert T.hull_edges == hull_edges(P)
+        assert T.hull_pts == set(convex_hull(P))
+        assert T.check_delaunay() == []
+        assert len(T.edges) == 3*len(P) - 3 - len(T.hull_pts)
+
+def test_insert_outside_hull_needs_dynamic_hull():
+    random.seed(32)
+    P = sample_integer_points(20)
+    T = Triangulation(P, make_legal=True)
+    T.random_incremental()
+    edges = set(T.edges)
+    with pytest.raises(ValueError):
+        T.insert_point(Point(-5, 300)) # nothing above it, as it is left of every edge
+    assert set(T.edges) == edges
+
+def test_nearest_vertex_is_not_observed(tmp_path):
+    from events import EventRecorder, read_events
+    from stats import Stats
+    random.seed(44)
+    P = sample_integer_points(50)
+    stats = Stats()
+    T = Triangulation(P, make_legal=True, stats=stats)
+    T.random_incremental()
+    locates = stats.counts['locates']
+
+    log = str(tmp_path / 'events.log')
+    with EventRecorder(log) as rec:
+        T.subscribe(rec)
+        for q in [Point(-50, -50), Point(1000, 200), Point(250, 250)]: # two of them outside the hull
+            assert T.nearest_vertex(q) == min(P, key=lambda v: (v.x()-q.x())**2 + (v.y()-q.y())**2)
+        rec('point_located', Point(-50, -50), None, None)
+    assert stats.counts['locates'] == locates
+    events = list(read_events(log))
+    assert [e for e, _ in events] == ['point_located'] # only the one recorded by hand, with NaN for the missing segment
+    assert events[0][1][0] == (-50.0, -50.0)
+
+def test_walk_segments_skips_starts_outside_hull():
+    random.seed(49)
+    P = sample_integer_points(80)
+    T = Triangulation(P, make_legal=True)
+    T.random_incremental()
+    h = convex_hull(P)
+    inside = [Point(sum(v.x() for v in h[i:i+3])/3, sum(v.y() for v in h[i:i+3])/3) for i in range(4)]
+    segments = [(inside[0], inside[1]), (Point(-100, -100), inside[2]), (inside[2], inside[3]), (inside[3], Point(5000, 5000))]
+    results = T.walk_segments(segments)
+    assert results[1] is None
+    for (a, b), r in zip(segments, results):
+        if r is not None:
+            tris, edges, params, points = r
+            expected = T.walk_segment(a, b)
+            assert tris.tolist() == expected[0].tolist() and edges.tolist() == expected[1].tolist()
+    assert results[3][0].size and len(results[3][1]) == len(results[3][0]) # leaves the hull
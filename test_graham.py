@@ -0,0 +1,25 @@
+import random
+import numpy as np
+from primitives import Point
+from graham import graham, graham_indices, convex_hull, _chain
+
+def test_matches_graham():
+    random.seed(31)
+    for n in (3, 4, 10, 100, 1000):
+        xs, ys = random.sample(range(-5*n, 5*n), n), random.sample(range(-5*n, 5*n), n) # distinct x, as graham() assumes
+        P = [Point(x, y) for x, y in zip(xs, ys)]
+        assert convex_hull(P) == graham(P)
+
+def test_parabola_worst_case():
+    # every point of a parabola is on the hull, so the Akl-Toussaint filter keeps all of them
+    n = 200000
+    i = np.arange(-n//2, n//2, dtype=np.int64)
+    hull = graham_indices(i, i*i)
+    assert hull.tolist() == list(range(n)) # CCW from the leftmost point along the lower chain
+
+    # a parabola followed by a point far below it: each point of the arc turns the wrong way only once the
+    # point after it is gone, so removing all wrong turns at once would take a pass per point of the arc
+    i = np.arange(n, dtype=np.int64)
+    xs = np.append(i, n)
+    ys = np.append(i*i, -n*n)
+    assert _chain(xs, ys, np.arange(n + 1), 1).tolist() == [0, n]
@@ -0,0 +1,49 @@
+import random
+import numpy as np
+from primitives import Point
+from delaunay import Triangulation
+from graphs import DelaunayGraph
+
+def test_graphs_match_brute_force():
+    random.seed(45)
+    n = 150
+    P = [Point(x, y) for x, y in zip(random.sample(range(2000), n), random.sample(range(2000), n))]
+    T = Triangulation(P, make_legal=True)
+    T.random_incremental()
+    G = DelaunayGraph(T)
+    xy = G.xy
+    d2 = ((xy[:, None, :] - xy[None, :, :])**2).sum(axis=2)
+    pairs = lambda es: set(map(tuple, G.edges[es].tolist()))
+
+    # minimum spanning tree: Prim's algorithm on the complete graph gives the same total length
+    best = d2[0].copy()
+    done = np.zeros(n, dtype=bool)
+    done[0] = True
+    total = 0.0
+    for _ in range(n - 1):
+        v = np.argmin(np.where(done, np.inf, best))
+        total += np.sqrt(best[v])
+        done[v] = True
+        best = np.minimum(best, d2[v])
+    emst = G.emst()
+    assert len(emst) == n - 1
+    assert np.isclose(np.sqrt(G.d2[emst]).sum(), total)
+
+    # Gabriel: no vertex strictly inside the diametral circle; RNG: none strictly inside the lune
+    gabriel, rng = set(), set()
+    for u in range(n):
+        for v in range(u + 1, n):
+            dot = ((xy[u] - xy)*(xy[v] - xy)).sum(axis=1)
+            if not (dot < 0).any():
+                gabriel.add((u, v))
+            if not (np.maximum(d2[u], d2[v]) < d2[u, v]).any():
+                rng.add((u, v))
+    assert pairs(G.gabriel()) == gabriel
+    assert pairs(G.rng()) == rng
+    assert pairs(emst) <= rng <= gabriel
+
+    # the two nearest neighbors are exact
+    idx, dist = G.knn(4)
+    np.fill_diagonal(d2, np.inf)
+    assert np.array_equal(dist[:, :2], np.sort(d2, axis=1)[:, :2])
+    assert np.array_equal(d2[np.arange(n)[:, None], idx], dist)
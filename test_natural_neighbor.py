@@ -0,0 +1,53 @@
+import random
+import numpy as np
+from primitives import Point
+from delaunay import Triangulation
+from natural_neighbor import NaturalNeighbor
+
+def mesh(n, size, seed):
+    random.seed(seed)
+    P = [Point(x, y) for x, y in zip(random.sample(range(size), n), random.sample(range(size), n))]
+    T = Triangulation(P, make_legal=True)
+    T.random_incremental()
+    verts, tris, nbrs = T.to_arrays()
+    return T, np.array([(p.x(), p.y()) for p in verts], dtype=np.float64), tris, nbrs
+
+def test_reproduces_linear_data_on_edges_and_vertices():
+    T, xy, tris, nbrs = mesh(300, 10**6, 43)
+    f = lambda x, y: 3*x + y + 7
+    N = NaturalNeighbor(T, f(xy[:, 0], xy[:, 1]))
+
+    # the edge of triangle t opposite its vertex i, and whether another triangle lies across it
+    a = np.concatenate([tris[:, (i+1)%3] for i in range(3)])
+    b = np.concatenate([tris[:, (i+2)%3] for i in range(3)])
+    inner = np.concatenate([nbrs[:, i] for i in range(3)]) >= 0
+    pa, pb = xy[a], xy[b]
+    d = pb - pa
+    normal = np.stack([-d[:, 1], d[:, 0]], axis=1) / np.hypot(d[:, 0], d[:, 1])[:, None] # towards the triangle
+
+    queries = [xy] # the vertices
+    for s in (0.37, 0.5, 0.5 + 1e-9):
+        queries.append(pa + s*d) # on interior and hull edges
+    queries.append((pa + pb)/2 + 1e-3*normal) # just off the edges, inside the hull
+    queries.append(((pa + pb)/2 - 1e-3*normal)[inner])
+    q = np.concatenate(queries)
+
+    values = N.interpolate(q[:, 0], q[:, 1])
+    inside = np.isfinite(values)
+    assert inside.sum() >= len(q) - (~inner).sum()*3 # only points rounded off a hull edge may be outside
+    assert np.allclose(values[inside], f(q[inside, 0], q[inside, 1]), rtol=1e-9, atol=0)
+
+    qv, v, w = N.weights(q[:, 0], q[:, 1])
+    assert np.all(w >= -1e-9)
+    assert np.allclose(np.bincount(qv, weights=w)[inside], 1)
+    own = (qv < len(xy)) & (v == qv) # a query on a vertex
+    assert own.sum() == len(xy) and np.allclose(w[own], 1)
+
+def test_weights_are_area_ratios():
+    # a query in the middle of a square of four sites takes a quarter from each
+    T = Triangulation([Point(0, 0), Point(10, 1), Point(9, 11), Point(-1, 10)], make_legal=True)
+    T.random_incremental()
+    N = NaturalNeighbor(T, np.arange(4))
+    q, v, w = N.weights([4.5], [5.5])
+    assert sorted(v.tolist()) == [0, 1, 2, 3]
+    assert np.allclose(w, 0.25)
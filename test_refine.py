@@ -0,0 +1,41 @@
+import random
+import numpy as np
+from primitives import Point
+from delaunay import Triangulation
+from refine import Refiner, encroaches
+
+def angles_and_areas(T):
+    '''return the (m,3) angles in degrees and the (m,) areas of the triangles of T, and whether each of their
+    corners lies between two hull edges'''
+    verts, tris, nbrs = T.to_arrays()
+    xy = np.array([(p.x(), p.y()) for p in verts], dtype=np.float64)
+    p = xy[tris]
+    angles = np.empty(tris.shape)
+    for i in range(3):
+        u, v = p[:, (i+1) % 3] - p[:, i], p[:, (i+2) % 3] - p[:, i]
+        angles[:, i] = np.degrees(np.arctan2(np.abs(u[:, 0]*v[:, 1] - u[:, 1]*v[:, 0]), (u*v).sum(axis=1)))
+    d1, d2 = p[:, 1] - p[:, 0], p[:, 2] - p[:, 0]
+    areas = (d1[:, 0]*d2[:, 1] - d1[:, 1]*d2[:, 0]) / 2
+    corner = (nbrs[:, [2, 0, 1]] < 0) & (nbrs[:, [1, 2, 0]] < 0) # the edges opposite i+2 and i+1 meet at i
+    return angles, areas, corner
+
+def test_refined_mesh_meets_the_bounds():
+    random.seed(50)
+    n = 40
+    P = [Point(x, y) for x, y in zip(random.sample(range(1000), n), random.sample(range(1000), n))]
+    T = Triangulation(P, make_legal=True)
+    T.random_incremental()
+    _, before, _ = angles_and_areas(T)
+
+    R = Refiner(T, min_angle=25, max_area=5000).run()
+    assert R.steiner > 0
+    assert T.check_delaunay() == []
+
+    angles, areas, corner = angles_and_areas(T)
+    assert (angles[~corner] >= 25 - 1e-9).all()
+    assert (areas > 0).all() and (areas <= 5000).all()
+    assert np.isclose(areas.sum(), before.sum()) # midpoints of hull edges keep the hull
+
+    # no hull edge is encroached upon by the vertex opposite it
+    for s in T.hull_edges:
+        assert not any(encroaches(p, s.p1, s.p2) for p in T.adj if p != s.p1 and p != s.p2)
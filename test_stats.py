@@ -0,0 +1,37 @@
+import random
+from delaunay import Triangulation, sample_integer_points
+from stats import Stats
+
+def test_counts_predicates_of_one_instance():
+    random.seed(37)
+    P = sample_integer_points(40)
+    stats = Stats()
+    T = Triangulation(P, use_tree=True, make_legal=True, stats=stats)
+    T.random_incremental()
+    counts = dict(stats.counts)
+    assert counts['orient'] > 0 and counts['in_circle'] > 0
+    assert counts['inserts'] == counts['locates'] > 0
+
+    # a Triangulation built without stats, or measured by another Stats, leaves these counts alone
+    U = Triangulation(sample_integer_points(40), make_legal=True)
+    U.random_incremental()
+    other = Stats()
+    V = Triangulation(sample_integer_points(40), make_legal=True, stats=other)
+    V.random_incremental()
+    assert stats.counts == counts
+    assert other.counts['orient'] > 0 and other.counts['in_circle'] > 0
+
+def test_location_steps_count_only_point_location():
+    random.seed(38)
+    P = sample_integer_points(40)
+    stats = Stats()
+    T = Triangulation(P, use_tree=True, make_legal=True, stats=stats)
+    T.random_incremental()
+    counts = dict(stats.counts)
+    assert counts['location_steps'] > 0
+
+    # nearest_vertex() shoots through the same segment tree, but does not locate a point to insert
+    for p in sample_integer_points(20):
+        T.nearest_vertex(p)
+    assert stats.counts['location_steps'] == counts['location_steps']
+    assert stats.counts['locates'] == counts['locates']
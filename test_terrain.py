@@ -0,0 +1,36 @@
+import numpy as np
+from tin import TIN
+from terrain import TerrainSimplifier
+
+def terrain(rows, cols, seed):
+    rng = np.random.default_rng(seed)
+    i, j = np.meshgrid(np.arange(rows), np.arange(cols), indexing='ij')
+    return 10*np.sin(i/4.0) * np.cos(j/5.0) + rng.normal(scale=0.5, size=(rows, cols))
+
+def test_error_bound_holds_on_every_sample():
+    z = terrain(24, 30, 47)
+    S = TerrainSimplifier(z)
+    for max_error in (3.0, 1.0, 0.25):
+        S.run(max_error=max_error)
+        assert S.T.check_delaunay() == []
+        assert S.error() <= max_error
+
+        # the error of the mesh, by interpolating it linearly at every sample
+        i, j = np.meshgrid(np.arange(S.rows), np.arange(S.cols), indexing='ij')
+        x, y = S._coords(i.astype(np.float64), j.astype(np.float64))
+        mi, mj, mz, _ = S.mesh()
+        f = TIN(S.T, mz).interpolate(x, y)
+        assert not np.isnan(f).any()
+        assert np.abs(f - z).max() <= max_error + 1e-9
+
+def test_vertex_budget():
+    z = terrain(20, 20, 7)
+    S = TerrainSimplifier(z).run(max_vertices=120)
+    assert len(S.T.adj) == 120
+    assert S.error() > 0
+    i, j, _, tris = S.mesh()
+    assert len(set(zip(i.tolist(), j.tolist()))) == 120
+    assert len(tris) > 0
+
+    # with no budget, all samples with an error are inserted and the mesh interpolates the grid
+    assert S.run().error() == 0.0
@@ -0,0 +1,37 @@
+import random
+import numpy as np
+from primitives import Point
+from delaunay import Triangulation, sample_integer_points
+from tin import TIN
+
+def test_reproduces_linear_data():
+    random.seed(42)
+    T = Triangulation(sample_integer_points(200), make_legal=True)
+    T.random_incremental()
+    verts = T.to_arrays()[0]
+    xy = np.array([(p.x(), p.y()) for p in verts])
+    f = lambda x, y: np.stack([2*x - y + 5, x + 3*y], axis=-1)
+    tin = TIN(T, f(xy[:, 0], xy[:, 1]))
+
+    rng = np.random.default_rng(42)
+    q = rng.uniform(xy.min() - 100, xy.max() + 100, (50, 40, 2)) # some of them outside the hull
+    values = tin.interpolate(q[..., 0], q[..., 1])
+    assert values.shape == (50, 40, 2)
+
+    tri = tin.locate(q[..., 0].ravel(), q[..., 1].ravel())
+    inside = (tri >= 0).reshape(50, 40)
+    assert 0 < inside.sum() < inside.size
+    assert np.isnan(values[~inside]).all()
+    assert np.allclose(values[inside], f(q[inside, 0], q[inside, 1]), rtol=1e-12, atol=1e-9)
+
+    # every query found inside lies in (the closure of) its triangle, and every vertex in the hull
+    a, b, c = (xy[tin.tris[tri[tri >= 0], i]] for i in range(3))
+    p = q.reshape(-1, 2)[tri >= 0]
+    cross = lambda u, v, w: (v[:, 0]-u[:, 0])*(w[:, 1]-u[:, 1]) - (v[:, 1]-u[:, 1])*(w[:, 0]-u[:, 0])
+    assert (cross(a, b, p) >= -1e-9).all() and (cross(b, c, p) >= -1e-9).all() and (cross(c, a, p) >= -1e-9).all()
+    assert (tin.locate(xy[:, 0], xy[:, 1]) >= 0).all()
+
+def test_values_by_vertex():
+    T = Triangulation([Point(0, 0), Point(10, 1), Point(4, 8)])
+    tin = TIN(T, {Point(0, 0): 0.0, Point(10, 1): 10.0, Point(4, 8): 4.0}) # the value is x
+    assert np.allclose(tin.interpolate([3.0, 5.0], [2.0, 3.0]), [3.0, 5.0])
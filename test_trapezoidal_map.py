@@ -0,0 +1,45 @@
+import random
+from primitives import Point, orient
+from delaunay import Triangulation, sample_integer_points
+from trapezoidal_map import TrapezoidalMap
+
+def in_closure(verts, tri, p):
+    a, b, c = (verts[i] for i in tri)
+    return orient(a, b, p) >= 0 and orient(b, c, p) >= 0 and orient(c, a, p) >= 0
+
+def test_locate_closed_triangulation():
+    random.seed(29)
+    T = Triangulation(sample_integer_points(80), make_legal=True)
+    T.random_incremental()
+    verts, tris, _ = T.to_arrays()
+    tris = tris.tolist()
+    M = TrapezoidalMap(verts, tris)
+
+    # the vertices, exact points on every edge, and random points inside and outside the hull
+    queries = list(verts)
+    for tri in tris:
+        for i in range(3):
+            a, b = verts[tri[i]], verts[tri[(i+1)%3]]
+            queries.append(Point(a.x() + b.x(), a.y() + b.y(), 2))
+            queries.append(Point(2*a.x() + b.x(), 2*a.y() + b.y(), 3))
+    queries += [Point(random.randrange(-100, 1100), random.randrange(-100, 1100)) for _ in range(2000)]
+
+    for p in queries:
+        t = M.locate(p)
+        if t < 0:
+            assert not any(in_closure(verts, tri, p) for tri in tris), p
+        else:
+            assert in_closure(verts, tris[t], p), p
+
+def test_lower_hull_edge():
+    # the lower hull edges (0,0)-(10,-3)-(20,0) and the upper one (0,0)-(10,10)
+    verts = [Point(0, 0), Point(10, -3), Point(20, 0), Point(10.5, 10)]
+    M = TrapezoidalMap(verts, [(0, 1, 2), (0, 2, 3)])
+    assert M.locate(Point(5, -1.5)) == 0
+    assert M.locate(Point(15, -1.5)) == 0
+    assert M.locate(Point(5.25, 5)) == 1
+    assert M.locate(Point(5, -2)) == -1
+
+    # the map restored from to_dict() answers the same
+    R = TrapezoidalMap.from_dict(M.to_dict())
+    assert [R.locate(p) for p in verts] == [M.locate(p) for p in verts] == [0, 0, 0, 1]
@@ -0,0 +1,129 @@
+import numpy as np
+from arrayutils import morton_order
+
+class TIN():
+    '''a triangulated irregular network: the piecewise linear interpolant of values given at the vertices
+    of a Triangulation, e.g. the elevations of the Mt Bruno grid of delaunay_demo.py.
+
+    Queries are answered in batches: they are sorted along a Morton curve, every 4096th query is located
+    by walking from a fixed triangle, every 64th by walking from the one before it at the coarser level,
+    and the rest likewise, so most walks only take a few steps. All walks of a level advance together,
+    one triangle per numpy step, and the barycentric weights are computed for all queries at once.
+
+    Attributes:
+        xy      (n,2) float coordinates of the vertices, in the order of Triangulation.to_arrays()
+        tris    (m,3) CCW vertex indices of the triangles
+        nbrs    (m,3) the triangle opposite each vertex of each triangle, or -1
+        values  (n,) or (n,k) values at the vertices, k being the number of channels'''
+
+    def __init__(self, triangulation, values, seed=0):
+        '''`values` maps each vertex (Point) of the triangulation to its value or to a sequence of k values
+        (channels), or is an array of shape (n,) or (n,k) in the vertex order of triangulation.to_arrays()'''
+        verts, self.tris, self.nbrs = triangulation.to_arrays()
+        self.xy = np.array([(p.x(), p.y()) for p in verts], dtype=np.float64).reshape(-1, 2)
+
+        if isinstance(values, dict):
+            values = [values[p] for p in verts]
+        self.values = np.asarray(values, dtype=np.float64)
+        if len(self.values) != len(verts):
+            raise ValueError("expected {} values, one per vertex, got {}".format(len(verts), len(self.values)))
+
+        self.rng = np.random.default_rng(seed)
+
+    def _orient(self, a, b, qx, qy):
+        '''twice the signed area of the triangles (a[i], b[i], q[i]) for vertex index arrays a, b, positive
+        if q[i] lies left of a[i] -> b[i]. The edge is always evaluated from its smaller vertex index, so
+        the two triangles sharing an edge never both see q on their outside because of rounding.'''
+        swap = a > b
+        lo, hi = np.where(swap, b, a), np.where(swap, a, b)
+        x, y = self.xy[:, 0], self.xy[:, 1]
+        o = (x[hi] - x[lo])*(qy - y[lo]) - (y[hi] - y[lo])*(qx - x[lo])
+        return np.where(swap, -o, o)
+
+    def _walk(self, qx, qy, start):
+        '''walk from the triangles `start` towards the query points, crossing at each step a random one of the
+        edges that separate the current triangle from its query (which terminates with probability 1 in any
+        triangulation). Return (tri, last): tri[i] is the triangle containing query i or -1 if it lies outside
+        the hull, and last[i] is the last triangle visited, a good start for nearby queries.'''
+        tri = start.copy()
+        last = start.copy()
+        active = np.arange(len(start))
+
+        while len(active):
+            t = tri[active]
+            v = self.tris[t]
+            x, y = qx[active], qy[active]
+            outside = np.stack([self._orient(v[:, (i+1)%3], v[:, (i+2)%3], x, y) < 0 for i in range(3)], axis=1)
+
+            moving = outside.any(axis=1)
+            active, t, outside = active[moving], t[moving], outside[moving]
+            i = np.argmax(self.rng.random(outside.shape)*outside, axis=1)
+            nxt = self.nbrs[t, i]
+
+            exited = nxt < 0 # q lies beyond a hull edge, so outside the (convex) hull
+            tri[active[exited]] = -1
+            active, nxt = active[~exited], nxt[~exited]
+            tri[active] = nxt
+            last[active] = nxt
+
+        return tri, last
+
+    def locate(self, xs, ys):
+        '''return an integer array with, for each query point (xs[i], ys[i]), the index into self.tris of a
+        triangle containing it, or -1 if it lies outside the hull'''
+        qx = np.asarray(xs, dtype=np.float64).ravel()
+        qy = np.asarray(ys, dtype=np.float64).ravel()
+        n = len(qx)
+        if n == 0 or len(self.tris) == 0:
+            return np.full(n, -1, dtype=np.int64)
+
+        order = morton_order(qx, qy)
+        qx, qy = qx[order], qy[order]
+
+        tri = np.zeros(n, dtype=np.int64)
+        last = np.zeros(n, dtype=np.int64)
+        prev = None
+        for stride in (4096, 64, 1):
+            at = np.arange(0, n, stride)
+            start = np.zeros(len(at), dtype=np.int64) if prev is None else last[(at // prev)*prev]
+            tri[at], last[at] = self._walk(qx[at], qy[at], start)
+            prev = stride
+
+        res = np.empty(n, dtype=np.int64)
+        res[order] = tri
+        return res
+
+    def barycentric(self, xs, ys):
+        '''return (tri, w): for each query point, the triangle containing it as in locate(), and the (n,3) array
+        of the barycentric weights of the vertices self.tris[tri] at it, NaN for the points outside the hull'''
+        qx = np.asarray(xs, dtype=np.float64).ravel()
+        qy = np.asarray(ys, dtype=np.float64).ravel()
+        tri = self.locate(qx, qy)
+
+        w = np.full((len(qx), 3), np.nan)
+        inside = np.nonzero(tri >= 0)[0]
+        a, b, c = self.tris[tri[inside]].T
+        x, y = qx[inside], qy[inside]
+
+        # the areas of the triangles q forms with each edge, over the area of the triangle
+        area = self._orient(a, b, self.xy[c, 0], self.xy[c, 1])
+        w[inside, 0] = self._orient(b, c, x, y) / area
+        w[inside, 1] = self._orient(c, a, x, y) / area
+        w[inside, 2] = 1 - w[inside, 0] - w[inside, 1]
+        return tri, w
+
+    def interpolate(self, xs, ys):
+        '''return the linearly interpolated values at the query points, with the shape of xs (followed by the
+        number of channels, if the values have several), and NaN for points outside the hull'''
+        shape = np.shape(xs)
+        tri, w = self.barycentric(xs, ys)
+
+        channels = self.values.shape[1:]
+        out = np.full((len(tri),) + channels, np.nan)
+        inside = np.nonzero(tri >= 0)[0]
+        a, b, c = self.tris[tri[inside]].T
+        wa, wb, wc = w[inside].T
+
+        expand = (slice(None),) + (None,)*len(channels)
+        out[inside] = wa[expand]*self.values[a] + wb[expand]*self.values[b] + wc[expand]*self.values[c]
+        return out.reshape(shape + channels)
@@ -0,0 +1,296 @@
+from primitives import *
+from array import array
+import random
+import math
+import warnings
+import numpy as np
+
+LEAF, XNODE, YNODE = 0, 1, 2
+
+class Trapezoid(object):
+    '''a trapezoid of a TrapezoidalMap, bounded above and below by the Segments `top` and `bottom`
+    (None if unbounded) and on the left and right by vertical walls through the Points `leftp`
+    and `rightp` (None if unbounded). `node` is the leaf of the search structure for this trapezoid.'''
+
+    __slots__ = ('top', 'bottom', 'leftp', 'rightp', 'node')
+
+    def __init__(self, top, bottom, leftp, rightp):
+        self.top = top
+        self.bottom = bottom
+        self.leftp = leftp
+        self.rightp = rightp
+        self.node = _Node(LEAF, self)
+
+class _Node(object):
+    '''a node of the search DAG used while building: a leaf storing a Trapezoid, an x-node storing a
+    Point (children: left, right) or a y-node storing a Segment (children: above, below)'''
+
+    __slots__ = ('kind', 'obj', 'c0', 'c1')
+
+    def __init__(self, kind, obj, c0=None, c1=None):
+        self.kind = kind
+        self.obj = obj
+        self.c0 = c0
+        self.c1 = c1
+
+def _slope_above(s, e):
+    '''given two segments starting at a common point, return True if and only if s lies above e to the right of it'''
+    dxs = s.right._x*s.left._w - s.left._x*s.right._w
+    dys = s.right._y*s.left._w - s.left._y*s.right._w
+    dxe = e.right._x*e.left._w - e.left._x*e.right._w
+    dye = e.right._y*e.left._w - e.left._y*e.right._w
+    return dxe*dys - dye*dxs > 0
+
+class TrapezoidalMap():
+    '''a static point-location index for a finished Triangulation, built as the randomized incremental
+    trapezoidal map of its edges (de Berg et al., Ch. 6). Queries walk a search DAG stored in flat arrays,
+    so the index can be pickled or exported with to_dict() alongside the mesh it was built for.
+
+    The DAG has expected depth O(log n); the constructor rebuilds with a fresh random order until its
+    depth is at most `depth_factor`*log2(n), so every query takes O(log n) time. If none of `max_tries`
+    builds is that shallow, the shallowest one is kept and a RuntimeWarning is issued; the depth of the
+    DAG in use (the number of nodes on its longest root-to-leaf path) is kept in self.depth either way.
+
+    ASSUMPTION: no two vertices of the triangulation have the same x-coordinate.'''
+
+    def __init__(self, verts, tris, depth_factor=6, max_tries=10):
+        '''build the map for the triangles `tris` (an (m,3) array of CCW vertex indices) over the Points `verts`'''
+        self.verts = list(verts)
+        self.tris = np.asarray(tris, dtype=np.int64).reshape(-1, 3)
+
+        # each edge once, as (left, right) vertex indices, and the triangles lying below and above it
+        below, above = {}, {}
+        for t, tri in enumerate(self.tris.tolist()):
+            for i in range(3):
+                a, b = tri[i], tri[(i+1)%3]
+                if self.verts[b].is_left_of(self.verts[a]): # CCW triangles lie below edges directed right-to-left
+                    below[(b, a)] = t
+                    above.setdefault((b, a), -1)
+                else:
+                    above[(a, b)] = t
+                    below.setdefault((a, b), -1)
+        self.segs = list(below.keys())
+        self.above = array('i', [above[s] for s in self.segs])
+        self._find_corner()
+
+        bound = depth_factor*math.log2(len(self.segs) + 2)
+        best, self.depth = None, None
+        for _ in range(max_tries):
+            root = self._build()
+            depth = self._depth(root)
+            if best is None or depth < self.depth:
+                best, self.depth = root, depth
+            if depth <= bound:
+                break
+        else:
+            warnings.warn("no search DAG of depth at most {:.1f} in {} tries, keeping one of depth {}"
+                          .format(bound, max_tries, self.depth), RuntimeWarning)
+
+        self._freeze(best, below)
+
+    def _find_corner(self):
+        '''set self.corner to a triangle at the rightmost vertex self.corner_vertex, or both to -1 if there
+        are no triangles'''
+        self.corner = self.corner_vertex = -1
+        if len(self.tris):
+            self.corner_vertex = max(set(self.tris.ravel().tolist()), key=lambda v: self.verts[v])
+            self.corner = int(np.nonzero((self.tris == self.corner_vertex).any(axis=1))[0][0])
+
+    @classmethod
+    def from_triangulation(cls, T, **kwargs):
+        '''return a TrapezoidalMap for the bounded triangles of the given Triangulation'''
+        verts, tris, _ = T.to_arrays()
+        return cls(verts, tris, **kwargs)
+
+    def _build(self):
+        '''insert the segments in random order, returning the root of the search DAG'''
+        order = list(range(len(self.segs)))
+        random.shuffle(order)
+
+        self.root = Trapezoid(None, None, None, None).node
+        for k in order:
+            a, b = self.segs[k]
+            seg = Segment(self.verts[a], self.verts[b])
+            seg.index = k
+            self._insert(seg)
+
+        return self.root
+
+    def _locate_segment(self, s, x):
+        '''return the trapezoid containing the part of segment s just right of the vertical line through
+        the Point x, where x is s.left or a point strictly inside s's x-extent'''
+
+        on_s = x
+        if x is not s.left:
+            num, den = y_at(s, x)
+            on_s = Point(x._x*den, num*x._w, x._w*den)
+
+        node = self.root
+        while node.kind != LEAF:
+            if node.kind == XNODE:
+                node = node.c0 if x.is_left_of(node.obj) else node.c1
+            else:
+                e = node.obj
+                o = orient(e.left, e.right, on_s)
+                if o > 0 or (o == 0 and _slope_above(s, e)):
+                    node = node.c0
+                else:
+                    node = node.c1
+
+        return node.obj
+
+    def _insert(self, s):
+        '''add the segment s to the map, replacing the trapezoids it crosses'''
+        p, q = s.left, s.right
+
+        crossed = [self._locate_segment(s, p)]
+        while crossed[-1].rightp is not None and q.is_right_of(crossed[-1].rightp):
+            crossed.append(self._locate_segment(s, crossed[-1].rightp))
+
+        first, last = crossed[0], crossed[-1]
+        left_part = None
+        if first.leftp is None or p.is_right_of(first.leftp):
+            left_part = Trapezoid(first.top, first.bottom, first.leftp, p)
+        right_part = None
+        if last.rightp is None or last.rightp.is_right_of(q):
+            right_part = Trapezoid(last.top, last.bottom, q, last.rightp)
+
+        # the parts above and below s; a wall through a point above s only splits the upper part, and vice versa
+        upper = Trapezoid(first.top, s, p, None)
+        lower = Trapezoid(s, first.bottom, p, None)
+        for i, t in enumerate(crossed):
+            if i > 0:
+                r = crossed[i-1].rightp
+                if ccw(p, q, r):
+                    upper.rightp = r
+                    upper = Trapezoid(t.top, s, r, None)
+                else:
+                    lower.rightp = r
+                    lower = Trapezoid(s, t.bottom, r, None)
+
+            # the leaf of t becomes the subtree separating its replacement trapezoids
+            node = t.node
+            sub = _Node(YNODE, s, upper.node, lower.node)
+            if i == len(crossed) - 1 and right_part is not None:
+                sub = _Node(XNODE, q, sub, right_part.node)
+            if i == 0 and left_part is not None:
+                sub = _Node(XNODE, p, left_part.node, sub)
+            node.kind, node.obj, node.c0, node.c1 = sub.kind, sub.obj, sub.c0, sub.c1
+
+        upper.rightp = q
+        lower.rightp = q
+
+    def _depth(self, root):
+        '''return the number of nodes on the longest root-to-leaf path of the DAG'''
+        depth = {}
+        stack = [(root, False)]
+        while stack:
+            node, done = stack.pop()
+            if id(node) in depth:
+                continue
+            if node.kind == LEAF:
+                depth[id(node)] = 1
+            elif done:
+                depth[id(node)] = 1 + max(depth[id(node.c0)], depth[id(node.c1)])
+            else:
+                stack.append((node, True))
+                stack.append((node.c0, False))
+                stack.append((node.c1, False))
+        return depth[id(root)]
+
+    def _freeze(self, root, below):
+        '''store the DAG in flat arrays: for node i, kind[i] is LEAF, XNODE or YNODE, key[i] is the triangle
+        index (-1 outside the triangulation), the vertex index or the segment index respectively, and
+        c0[i], c1[i] are its children (left/right for x-nodes, above/below for y-nodes)'''
+
+        ids = {id(root): 0}
+        order = [root]
+        for node in order: # breadth-first, appending as we go
+            if node.kind != LEAF:
+                for child in (node.c0, node.c1):
+                    if id(child) not in ids:
+                        ids[id(child)] = len(order)
+                        order.append(child)
+
+        vindex = {id(p): i for i, p in enumerate(self.verts)}
+        self.kind = array('b', [LEAF])*len(order)
+        self.key = array('i', [-1])*len(order)
+        self.c0 = array('i', [-1])*len(order)
+        self.c1 = array('i', [-1])*len(order)
+
+        for i, node in enumerate(order):
+            self.kind[i] = node.kind
+            if node.kind == LEAF:
+                top = node.obj.top
+                if top is not None and node.obj.bottom is not None:
+                    self.key[i] = below[self.segs[top.index]]
+            else:
+                self.key[i] = vindex[id(node.obj)] if node.kind == XNODE else node.obj.index
+                self.c0[i] = ids[id(node.c0)]
+                self.c1[i] = ids[id(node.c1)]
+
+        del self.root
+
+    def locate(self, p):
+        '''return the index into self.tris of a triangle whose closure contains the Point p, or -1 if p lies
+        strictly outside the triangulation. Points on an edge report the triangle below it, or the one above
+        it on the lower hull, and a vertex reports one of its triangles.
+
+        The descent treats a point on a segment as below it, so on the lower hull it ends below the
+        triangulation: the last triangle above a segment through p is remembered for that case. It also
+        treats a point on a vertical wall as right of it, which only leaves the triangulation at its rightmost
+        vertex, one of whose triangles is kept in self.corner.'''
+        kind, key, c0, c1 = self.kind, self.key, self.c0, self.c1
+        verts, segs, above = self.verts, self.segs, self.above
+
+        i, on = 0, -1
+        while kind[i] != LEAF:
+            if kind[i] == XNODE:
+                i = c0[i] if p.is_left_of(verts[key[i]]) else c1[i]
+            else:
+                a, b = segs[key[i]]
+                o = orient(verts[a], verts[b], p)
+                if o == 0 and above[key[i]] >= 0:
+                    on = above[key[i]]
+                i = c0[i] if o > 0 else c1[i]
+        if key[i] >= 0:
+            return key[i]
+        if on >= 0:
+            return on
+        if self.corner >= 0 and p == verts[self.corner_vertex]:
+            return self.corner
+        return -1
+
+    def locate_many(self, points):
+        '''return an integer array of locate(p) for each of the given points'''
+        return np.fromiter((self.locate(p) for p in points), dtype=np.int64, count=len(points))
+
+    def to_dict(self):
+        '''return this map and its mesh as plain lists, e.g. to store as JSON next to the mesh'''
+        return {
+            'verts': [(p._x, p._y, p._w) for p in self.verts],
+            'tris': self.tris.tolist(),
+            'segs': [list(s) for s in self.segs],
+            'above': self.above.tolist(),
+            'kind': self.kind.tolist(),
+            'key': self.key.tolist(),
+            'c0': self.c0.tolist(),
+            'c1': self.c1.tolist(),
+            'depth': self.depth,
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        '''rebuild a TrapezoidalMap from the output of to_dict() without recomputing it'''
+        self = cls.__new__(cls)
+        self.verts = [Point(*v) for v in d['verts']]
+        self.tris = np.array(d['tris'], dtype=np.int64).reshape(-1, 3)
+        self.segs = [tuple(s) for s in d['segs']]
+        self.above = array('i', d['above'])
+        self.kind = array('b', d['kind'])
+        self.key = array('i', d['key'])
+        self.c0 = array('i', d['c0'])
+        self.c1 = array('i', d['c1'])
+        self.depth = d.get('depth')
+        self._find_corner()
+        return self
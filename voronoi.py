@@ -1,6 +1,7 @@
 from primitives import *
 from delaunay import *
 import random
+import matplotlib.pyplot as plt
 
 def get_voronoi(T, margin=1.2):
     '''given a Triangulation T, get the set of vertices and sets of 